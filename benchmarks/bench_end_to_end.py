@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end throughput benchmark for the bot's update handlers
+
+Builds the application exactly as main.py does, but with a recording fake
+in place of the Bot API and a temporary SQLite database, then drives
+synthetic updates through the real handlers and the concurrent update
+processor. Scenarios run in order: text posts, keyboard presses, single
+media, albums and the admin approvals of the submitted media. For each
+scenario it reports throughput, latency percentiles, SQLite statements
+and Bot API calls per update; statements run by background work the
+scenario caused (outbox publishing, message logs) are included.
+Telegram's flood limits are lifted so the bot's own cost is measured,
+not its pacing. Run from the repository root:
+
+    python benchmarks/bench_end_to_end.py [--updates 500] [--users 200] [--inflight 32]
+                                          [--api-latency-ms 0] [--json results.json]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["BOT_DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bench_e2e_"), "bench.db")
+os.environ.setdefault("TELEGRAM_CHANNEL_ID", "-1001000000000")
+
+from bot import config  # noqa: E402
+
+config.OUTBOUND_GLOBAL_PER_SECOND = 1e9
+config.OUTBOUND_CHANNEL_PER_MINUTE = 1e9
+config.OUTBOUND_CHAT_PER_SECOND = 1e9
+config.ALBUM_WINDOW_SECONDS = 0.05
+
+from telegram import Update  # noqa: E402
+from telegram.request import BaseRequest  # noqa: E402
+
+import main  # noqa: E402
+from bot import database  # noqa: E402
+from bot.keyboards import BTN_HELP, BTN_CHANNEL_LINK, BTN_SEND_MESSAGE, BTN_SEND_MEDIA  # noqa: E402
+
+ADMIN_ID = 123456789  # The placeholder admin created by init_database
+BOT_TOKEN = "1:benchmark"
+
+WORDS = (
+    "سلام دوستان امروز هوا خیلی خوب است چه خبر می‌دانید کلاس فردا برگزار می‌شود یا نه "
+    "لطفاً اگر خبری دارید بگویید ممنون از همه کتاب استاد امتحان دانشگاه خوابگاه غذا "
+    "hello anyone know when the library opens tomorrow thanks exam notes project deadline"
+).split()
+
+class RecordingRequest(BaseRequest):
+    """Fake Bot API that answers every call successfully and counts calls per method"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self._message_ids = itertools.count(1)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def _message(self, chat_id) -> dict:
+        try:
+            chat_id = int(chat_id)
+        except (TypeError, ValueError):
+            chat_id = -1
+        return {'message_id': next(self._message_ids), 'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'}}
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        name = url.rsplit('/', 1)[-1]
+        parameters = request_data.parameters if request_data else {}
+        if name == 'getMe':
+            result = {'id': 1, 'is_bot': True, 'first_name': 'bench', 'username': 'bench_bot'}
+        elif name == 'sendMediaGroup':
+            result = [self._message(parameters.get('chat_id')) for _ in parameters.get('media', [])]
+        elif name.startswith('send') or name.startswith('edit'):
+            result = self._message(parameters.get('chat_id'))
+        else:
+            result = True
+        return 200, json.dumps({'ok': True, 'result': result}).encode()
+
+class UpdateFactory:
+    """Synthetic update payloads with unique IDs"""
+
+    def __init__(self, users: int, seed: int):
+        self._rng = random.Random(seed)
+        self._users = [1000 + i for i in range(users)]
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._files = itertools.count(1)
+
+    def _message(self, user_id: int, **fields) -> dict:
+        message = {'message_id': next(self._message_ids), 'date': int(time.time()),
+                   'chat': {'id': user_id, 'type': 'private'},
+                   'from': {'id': user_id, 'is_bot': False, 'first_name': 'u'}}
+        message.update(fields)
+        return {'update_id': next(self._update_ids), 'message': message}
+
+    def _photo(self) -> list:
+        number = next(self._files)
+        return [{'file_id': f'F{number}', 'file_unique_id': f'U{number}', 'width': 1, 'height': 1}]
+
+    def user(self) -> int:
+        return self._rng.choice(self._users)
+
+    def text(self, index: int) -> dict:
+        words = " ".join(self._rng.choice(WORDS) for _ in range(self._rng.randint(8, 30)))
+        return self._message(self.user(), text=f"{words} {index}")
+
+    def button(self) -> dict:
+        return self._message(self.user(), text=self._rng.choice((BTN_HELP, BTN_CHANNEL_LINK, BTN_SEND_MESSAGE,
+                                                                  BTN_SEND_MEDIA)))
+
+    def media(self) -> dict:
+        return self._message(self.user(), photo=self._photo(), caption="benchmark")
+
+    def album(self, index: int, size: int = 3) -> list:
+        user_id = self.user()
+        return [self._message(user_id, photo=self._photo(), media_group_id=f"album{index}",
+                              **({'caption': "benchmark"} if item == 0 else {}))
+                for item in range(size)]
+
+    def approval(self, media_id: int) -> dict:
+        return {'update_id': next(self._update_ids), 'callback_query': {
+            'id': str(next(self._update_ids)), 'chat_instance': 'bench', 'data': f'approve_{media_id}',
+            'from': {'id': ADMIN_ID, 'is_bot': False, 'first_name': 'admin'},
+            'message': {'message_id': next(self._message_ids), 'date': int(time.time()),
+                        'chat': {'id': ADMIN_ID, 'type': 'private'}, 'text': 'prompt'}}}
+
+class StatementCounter:
+    """Statement tracer for bot.database; called on the database threads"""
+
+    def __init__(self):
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, statement: str):
+        with self._lock:
+            self._count += 1
+
+    def take(self) -> int:
+        """Statements since the previous call"""
+        with self._lock:
+            count, self._count = self._count, 0
+        return count
+
+async def settle(database_path: str, timeout: float = 30.0):
+    """Wait until albums are submitted and the outbox is drained
+
+    Polls through a separate, untraced connection so waiting adds no
+    statements to the count.
+    """
+    conn = sqlite3.connect(database_path)
+    try:
+        deadline = time.monotonic() + timeout
+        await asyncio.sleep(config.ALBUM_WINDOW_SECONDS * 2)
+        while time.monotonic() < deadline:
+            pending = conn.execute("SELECT COUNT(*) FROM outbox WHERE state = 'pending'").fetchone()[0]
+            if not pending:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        conn.close()
+    await asyncio.sleep(config.LOG_FLUSH_INTERVAL_MS / 1000 * 2)
+
+async def drive(application, payloads: list, inflight: int) -> tuple:
+    """Process payloads with at most `inflight` outstanding; returns (latencies, seconds)"""
+    processor = application.update_processor
+    limit = asyncio.Semaphore(inflight)
+    latencies = []
+
+    async def one(payload: dict):
+        async with limit:
+            update = Update.de_json(payload, application.bot)
+            started_at = time.perf_counter()
+            await processor.process_update(update, application.process_update(update))
+            latencies.append(time.perf_counter() - started_at)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(one(payload) for payload in payloads))
+    return latencies, time.perf_counter() - started_at
+
+def pending_media_ids(database_path: str) -> list:
+    conn = sqlite3.connect(database_path)
+    try:
+        rows = conn.execute("SELECT id FROM pending_media WHERE state = 'pending' ORDER BY id").fetchall()
+        return [row[0] for row in rows]
+    finally:
+        conn.close()
+
+async def run(args) -> list:
+    database_path = os.environ["BOT_DATABASE_PATH"]
+    database.init_database()
+    database.set_setting('rate_limit_minutes', '0')
+    counter = StatementCounter()
+    database.set_statement_tracer(counter)
+
+    request = RecordingRequest(args.api_latency_ms / 1000)
+    application = main.build_application(BOT_TOKEN, request=request)
+    factory = UpdateFactory(args.users, args.seed)
+    scenarios = (
+        ("text", lambda: [factory.text(i) for i in range(args.updates)]),
+        ("keyboard", lambda: [factory.button() for _ in range(args.updates)]),
+        ("media", lambda: [factory.media() for _ in range(args.updates)]),
+        ("album", lambda: [item for i in range(args.updates // 3) for item in factory.album(i)]),
+        ("approval", lambda: [factory.approval(media_id) for media_id in pending_media_ids(database_path)]),
+    )
+
+    results = []
+    await application.initialize()
+    await main.post_init(application)
+    try:
+        for name, build in scenarios:
+            payloads = build()
+            counter.take()
+            calls_before = request.calls
+            latencies, seconds = await drive(application, payloads, args.inflight)
+            await settle(database_path)
+            quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+            results.append({
+                'scenario': name,
+                'updates': len(payloads),
+                'updates_per_second': len(payloads) / seconds,
+                'p50_ms': quantiles[49] * 1000,
+                'p95_ms': quantiles[94] * 1000,
+                'p99_ms': quantiles[98] * 1000,
+                'statements_per_update': counter.take() / len(payloads),
+                'api_calls_per_update': (request.calls - calls_before) / len(payloads),
+            })
+    finally:
+        await main.post_shutdown(application)
+        await application.shutdown()
+        database.set_statement_tracer(None)
+        database.flush_message_logs()
+        database.close_db_connections()
+    return results
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=500, help="updates per scenario")
+    parser.add_argument("--users", type=int, default=200, help="distinct users sending them")
+    parser.add_argument("--inflight", type=int, default=32, help="updates outstanding at once")
+    parser.add_argument("--api-latency-ms", type=float, default=0.0, help="simulated Bot API round trip")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    results = asyncio.run(run(args))
+
+    print(f"{'scenario':>9} {'updates':>7} {'upd/s':>8} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} "
+          f"{'SQL/upd':>7} {'API/upd':>7}")
+    for r in results:
+        print(f"{r['scenario']:>9} {r['updates']:>7} {r['updates_per_second']:>8.0f} {r['p50_ms']:>7.2f} "
+              f"{r['p95_ms']:>7.2f} {r['p99_ms']:>7.2f} {r['statements_per_update']:>7.1f} "
+              f"{r['api_calls_per_update']:>7.1f}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main_cli()
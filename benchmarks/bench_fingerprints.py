@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the near-duplicate text index in bot.fingerprints
+
+Fills a FingerprintIndex with synthetic posts, then measures lookup time,
+how many lightly edited copies of indexed posts are caught, how many
+unrelated posts are wrongly flagged, and the memory held by the index.
+Run from the repository root:
+
+    python benchmarks/bench_fingerprints.py [--posts 100000] [--probes 5000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot.config import FINGERPRINT_MIN_SIMILARITY  # noqa: E402
+from bot.fingerprints import FingerprintIndex, text_signature  # noqa: E402
+
+WORDS = (
+    "سلام دوستان امروز هوا خیلی خوب است کسی می‌داند کلاس فردا برگزار می‌شود یا نه "
+    "لطفاً اگر خبری دارید بگویید ممنون از همه کتاب استاد امتحان دانشگاه خوابگاه غذا "
+    "سلف جزوه تمرین پروژه ساعت شنبه یکشنبه دوشنبه کتابخانه بسته باز جلسه ارائه نمره "
+    "hello anyone know when the library opens tomorrow thanks exam notes project deadline"
+).split()
+
+def make_post(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 40)))
+
+def edit_post(rng: random.Random, post: str) -> str:
+    """A spammer's variation: a word swapped or dropped, punctuation and emoji added"""
+    words = post.split()
+    position = rng.randrange(len(words))
+    if rng.random() < 0.5:
+        words[position] = rng.choice(WORDS)
+    elif len(words) > 6:
+        del words[position]
+    return rng.choice(("", "!!! ", "🔥 ")) + " ".join(words) + rng.choice(("", "!!", " ...", " 🙏"))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=100000, help="posts indexed before probing")
+    parser.add_argument("--probes", type=int, default=5000, help="edited and unrelated posts probed each")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    posts = [make_post(rng) for _ in range(args.posts)]
+
+    start = time.perf_counter()
+    signatures = [text_signature(post) for post in posts]
+    signatures = [signature for signature in signatures if signature is not None]
+    elapsed = time.perf_counter() - start
+    print(f"signatures: {elapsed / len(posts) * 1e6:.1f} us per post")
+
+    index = FingerprintIndex(window_seconds=3600, max_entries=args.posts, min_similarity=FINGERPRINT_MIN_SIMILARITY)
+    start = time.perf_counter()
+    for signature in signatures:
+        index.check_and_add(signature)
+    elapsed = time.perf_counter() - start
+    print(f"indexed {len(index)} of {len(signatures)} posts: {elapsed / len(signatures) * 1e6:.1f} us per post")
+
+    # Build a second index under tracemalloc, which is too slow to time
+    tracemalloc.start()
+    traced = FingerprintIndex(window_seconds=3600, max_entries=args.posts, min_similarity=FINGERPRINT_MIN_SIMILARITY)
+    for signature in signatures:
+        traced.check_and_add(signature)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"index memory: {memory / 2 ** 20:.1f} MiB ({memory / max(1, len(traced)):.0f} bytes per entry)")
+    del traced
+
+    edited = [edit_post(rng, rng.choice(posts)) for _ in range(args.probes)]
+    unrelated = [make_post(rng) + " " + make_post(rng) for _ in range(args.probes)]
+    for name, probes in (("edited", edited), ("unrelated", unrelated)):
+        signatures = [text_signature(probe) for probe in probes]
+        signatures = [signature for signature in signatures if signature is not None]
+        start = time.perf_counter()
+        flagged = sum(index.contains(signature) for signature in signatures)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>10}: {flagged / len(signatures):6.1%} flagged, "
+              f"{elapsed / len(signatures) * 1e6:.1f} us per lookup")
+
+if __name__ == "__main__":
+    main()
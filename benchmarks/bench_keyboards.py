@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the keyboard markups in bot.keyboards
+
+Compares the prebuilt, serialize-once markups against the previous
+factories, which built a new markup on every call. Each simulated update
+gets a markup and encodes it the way python-telegram-bot does for a
+request, so the serialization cost is included. Time is measured without
+tracing and memory with tracemalloc: the peak of transient allocations
+for one update. Run from the repository root:
+
+    python benchmarks/bench_keyboards.py [--number 20000] [--admins 8]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, KeyboardButton, ReplyKeyboardMarkup  # noqa: E402
+from telegram.request._requestparameter import RequestParameter  # noqa: E402
+
+from bot.keyboards import get_main_menu, get_media_approval_keyboard  # noqa: E402
+
+def legacy_get_main_menu():
+    """The previous implementation: a new markup per call"""
+    keyboard = [
+        [KeyboardButton("📝 ارسال پیام"), KeyboardButton("📷 ارسال رسانه")],
+        [KeyboardButton("✏️ تنظیم نام نمایشی"), KeyboardButton("❓ راهنما")],
+        [KeyboardButton("🔗 لینک کانال"), KeyboardButton("🔄 شروع مجدد")]
+    ]
+    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=False)
+
+def legacy_get_media_approval_keyboard(media_id: int):
+    """The previous implementation: serialized again for every admin"""
+    keyboard = [
+        [
+            InlineKeyboardButton("✅ تأیید", callback_data=f"approve_{media_id}"),
+            InlineKeyboardButton("❌ رد", callback_data=f"reject_{media_id}")
+        ]
+    ]
+    return InlineKeyboardMarkup(keyboard)
+
+def encode(markup) -> str:
+    """Encode a markup as python-telegram-bot does for a request parameter"""
+    return RequestParameter.from_input('reply_markup', markup).json_value
+
+def menu_update(factory):
+    return lambda: encode(factory())
+
+def approval_update(factory, admins: int):
+    def run():
+        markup = factory(12345)
+        for _ in range(admins):
+            encode(markup)
+    return run
+
+def transient_bytes(func) -> int:
+    """Peak memory allocated while running func once, beyond what was live before"""
+    func()
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak - baseline
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20000, help="updates per measurement")
+    parser.add_argument("--admins", type=int, default=8, help="admins receiving each approval prompt")
+    args = parser.parse_args()
+
+    cases = (
+        ("menu", "legacy", menu_update(legacy_get_main_menu)),
+        ("menu", "prebuilt", menu_update(get_main_menu)),
+        ("approval", "legacy", approval_update(legacy_get_media_approval_keyboard, args.admins)),
+        ("approval", "template", approval_update(get_media_approval_keyboard, args.admins)),
+    )
+    print(f"{args.number} updates each, approval prompts sent to {args.admins} admins")
+    for case, name, func in cases:
+        best = min(timeit.repeat(func, number=args.number, repeat=5))
+        print(f"{case:>9} {name:>9}: {best / args.number * 1e6:8.1f} us per update, "
+              f"{transient_bytes(func):6d} bytes peak allocation")
+
+if __name__ == "__main__":
+    main()
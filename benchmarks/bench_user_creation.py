@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark new-user creation in get_or_create_user at increasing table sizes
+
+Preloads the users table to each size, then times creating a batch of new
+users. Run from the repository root:
+
+    python benchmarks/bench_user_creation.py [--sizes 0 10000 100000 1000000] [--legacy]
+
+--legacy also times the previous COUNT(*) + probe-loop allocator.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["BOT_DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bench_users_"), "bench.db")
+
+from bot import database  # noqa: E402
+from bot.config import DEFAULT_DISPLAY_NAME_PREFIX  # noqa: E402
+
+def preload_users(target: int):
+    """Grow the users table to `target` rows using default names"""
+    conn = database.get_db_connection()
+    current = conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+    if current >= target:
+        return
+    conn.execute('''
+        WITH RECURSIVE seq(n) AS (SELECT ? UNION ALL SELECT n + 1 FROM seq WHERE n < ?)
+        INSERT INTO users (telegram_id, display_name)
+        SELECT 10000000000 + n, ? || n FROM seq
+    ''', (current + 1, target, DEFAULT_DISPLAY_NAME_PREFIX))
+    conn.commit()
+
+def legacy_create_user(telegram_id: int):
+    """The previous allocator: COUNT(*) followed by a probe loop"""
+    conn = database.get_db_connection()
+    user_count = conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+    display_name = f"{DEFAULT_DISPLAY_NAME_PREFIX}{user_count + 1}"
+    while conn.execute('SELECT id FROM users WHERE display_name = ?', (display_name,)).fetchone():
+        user_count += 1
+        display_name = f"{DEFAULT_DISPLAY_NAME_PREFIX}{user_count + 1}"
+    conn.execute('INSERT INTO users (telegram_id, display_name) VALUES (?, ?)', (telegram_id, display_name))
+    conn.commit()
+
+def time_batch(create, first_id: int, batch: int) -> float:
+    """Create `batch` users and return the mean microseconds per user"""
+    start = time.perf_counter()
+    for telegram_id in range(first_id, first_id + batch):
+        create(telegram_id)
+    return (time.perf_counter() - start) / batch * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[0, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--legacy", action="store_true")
+    args = parser.parse_args()
+
+    database.init_database()
+    next_id = 1
+    print(f"{'users':>10} {'get_or_create_user':>20}" + (f" {'legacy':>12}" if args.legacy else ""))
+    for size in sorted(args.sizes):
+        preload_users(size)
+        current = time_batch(database.get_or_create_user, next_id, args.batch)
+        next_id += args.batch
+        line = f"{size:>10} {current:>17.1f} us"
+        if args.legacy:
+            legacy = time_batch(legacy_create_user, next_id, args.batch)
+            next_id += args.batch
+            line += f" {legacy:>9.1f} us"
+        print(line)
+
+    database.flush_message_logs()
+    database.close_db_connections()
+
+if __name__ == "__main__":
+    main()
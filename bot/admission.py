@@ -0,0 +1,52 @@
+"""
+Admission checks for incoming user messages
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+
+from bot.database import get_or_create_user, get_settings, is_channel_active
+from bot.rate_limiter import consume_message_allowance
+
+logger = logging.getLogger(__name__)
+
+ACCEPTED = 'accepted'
+RATE_LIMITED = 'rate_limited'
+INACTIVE = 'inactive'
+ERROR = 'error'
+
+@dataclass(frozen=True)
+class AdmissionVerdict:
+    """Outcome of admit_message"""
+    status: str
+    user: dict = field(default_factory=dict)
+    retry_after_seconds: float = 0.0
+    activity_window: Optional[Tuple[int, int]] = None
+
+    @property
+    def accepted(self) -> bool:
+        return self.status == ACCEPTED
+
+def admit_message(telegram_id: int) -> AdmissionVerdict:
+    """Decide whether a user's message may be processed
+
+    Gets or creates the user, which is the only database statement for an
+    existing user, then checks the activity window against the cached
+    settings and consumes one message from the in-memory rate limiter. The
+    rate limit is only consumed when the channel is active.
+    """
+    user = get_or_create_user(telegram_id)
+    if not user:
+        return AdmissionVerdict(ERROR)
+
+    if not is_channel_active():
+        settings = get_settings()
+        window = (settings.activity_start_hour, settings.activity_end_hour)
+        return AdmissionVerdict(INACTIVE, user, activity_window=window)
+
+    allowed, retry_after = consume_message_allowance(telegram_id)
+    if not allowed:
+        return AdmissionVerdict(RATE_LIMITED, user, retry_after_seconds=retry_after)
+
+    return AdmissionVerdict(ACCEPTED, user)
@@ -0,0 +1,80 @@
+"""
+Buffering of album (media group) messages into one submission
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Optional
+
+from telegram import Message
+
+from bot.config import ALBUM_WINDOW_SECONDS
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class _Group:
+    messages: List[Message]
+    deadline: float
+
+class AlbumCollector:
+    """Gather the messages of a media group that arrive as separate updates
+
+    Telegram delivers every album item as its own message carrying the same
+    media_group_id. The first item opens a group; items that arrive within
+    ``window_seconds`` of the previous one join it. The first item's update
+    then waits in ``close_when_quiet`` until the album has been quiet for
+    the window and handles all of its messages, so the album is processed
+    inside that update, in the user's turn, rather than in a background task.
+    """
+
+    def __init__(self, window_seconds: float = ALBUM_WINDOW_SECONDS):
+        self._window_seconds = window_seconds
+        self._groups: Dict[Hashable, _Group] = {}
+
+    def collect(self, key: Hashable, message: Message) -> bool:
+        """Add a message to an open group; returns False if no group is open for key"""
+        group = self._groups.get(key)
+        if group is None:
+            return False
+        group.messages.append(message)
+        group.deadline = time.monotonic() + self._window_seconds
+        return True
+
+    def open(self, key: Hashable, message: Message):
+        """Open a group with its first message"""
+        self._groups[key] = _Group([message], time.monotonic() + self._window_seconds)
+
+    async def close_when_quiet(self, key: Hashable) -> List[Message]:
+        """Wait until no item joined the group for the window, then close it
+
+        Returns the group's messages in order, or an empty list if no group
+        is open for key (e.g. it was already closed).
+        """
+        group = self._groups.get(key)
+        if group is None:
+            return []
+        try:
+            while True:
+                delay = group.deadline - time.monotonic()
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+        finally:
+            if self._groups.get(key) is group:
+                del self._groups[key]
+        return sorted(group.messages, key=lambda message: message.message_id)
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+_collector: Optional[AlbumCollector] = None
+
+def get_album_collector() -> AlbumCollector:
+    """Get the shared album collector"""
+    global _collector
+    if _collector is None:
+        _collector = AlbumCollector()
+    return _collector
@@ -0,0 +1,75 @@
+"""
+Async facade over the database operations
+
+Handlers run on the python-telegram-bot event loop, so they must never call
+the blocking functions in bot.database directly. Every operation here runs on
+a single dedicated database thread and is returned as an awaitable, which
+also serializes SQLite writes without holding up other users' updates.
+"""
+
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from bot import database
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Get the database thread, starting it on first use"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db")
+    return _executor
+
+async def run_in_db_thread(func, *args, **kwargs):
+    """Run a blocking function on the database thread and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(func, *args, **kwargs))
+
+def shutdown_db_executor():
+    """Wait for queued database work to finish and stop the database thread"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+def _async(func):
+    """Wrap a bot.database function as an awaitable running on the database thread"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_in_db_thread(func, *args, **kwargs)
+    return wrapper
+
+get_or_create_user = _async(database.get_or_create_user)
+set_user_display_name = _async(database.set_user_display_name)
+is_channel_active = _async(database.is_channel_active)
+is_admin = _async(database.is_admin)
+add_admin = _async(database.add_admin)
+remove_admin = _async(database.remove_admin)
+get_all_admins = _async(database.get_all_admins)
+get_profanity_words = _async(database.get_profanity_words)
+add_profanity_word = _async(database.add_profanity_word)
+remove_profanity_word = _async(database.remove_profanity_word)
+get_setting = _async(database.get_setting)
+set_setting = _async(database.set_setting)
+add_pending_media = _async(database.add_pending_media)
+get_pending_media = _async(database.get_pending_media)
+remove_pending_media = _async(database.remove_pending_media)
+enqueue_channel_post = _async(database.enqueue_channel_post)
+decide_pending_media = _async(database.decide_pending_media)
+record_approval_prompts = _async(database.record_approval_prompts)
+find_media_decision = _async(database.find_media_decision)
+claim_due_outbox = _async(database.claim_due_outbox)
+release_outbox_leases = _async(database.release_outbox_leases)
+mark_outbox_delivered = _async(database.mark_outbox_delivered)
+mark_outbox_retry = _async(database.mark_outbox_retry)
+mark_outbox_failed = _async(database.mark_outbox_failed)
+
+async def log_message(user_telegram_id: int, message_type: str, status: str, reason: str = None):
+    """Queue a message log row; the buffered writer stores it in the background"""
+    database.log_message(user_telegram_id, message_type, status, reason)
@@ -3,20 +3,82 @@ Configuration settings for the bot
 """
 
 import os
+import socket
 
 # Bot Configuration
 BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 CHANNEL_ID = os.getenv("TELEGRAM_CHANNEL_ID")  # Channel where messages will be posted
 CHANNEL_USERNAME = os.getenv("TELEGRAM_CHANNEL_USERNAME", "")  # Without @
 
+# Webhook (updates are fetched by long polling when TELEGRAM_WEBHOOK_URL is not set)
+WEBHOOK_URL = os.getenv("TELEGRAM_WEBHOOK_URL")  # Public HTTPS URL Telegram posts updates to
+WEBHOOK_SECRET_TOKEN = os.getenv("TELEGRAM_WEBHOOK_SECRET")  # Required with a webhook; expected in the X-Telegram-Bot-Api-Secret-Token header
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")  # Interface the webhook server binds to
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))  # Plain-HTTP port behind the TLS-terminating proxy
+WEBHOOK_MAX_CONNECTIONS = 40  # Parallel connections Telegram may open to the webhook
+
+# Update Processing
+UPDATE_CONCURRENCY = 32  # Updates handled at once across all users; each user's updates stay in order
+UPDATE_MAX_ADMITTED = 1024  # Updates running or waiting for the same user's earlier updates
+
 # Database Configuration
-DATABASE_PATH = "bot_database.db"
+DATABASE_PATH = os.getenv("BOT_DATABASE_PATH", "bot_database.db")
+DB_BUSY_TIMEOUT_SECONDS = 5.0  # Wait this long for a write lock before failing
+DB_CACHE_SIZE_KB = 16384  # Page cache per pooled connection
+DB_MMAP_SIZE_BYTES = 256 * 1024 * 1024
+DB_STATEMENT_CACHE_SIZE = 256  # Prepared statements kept per connection
+LOG_FLUSH_MAX_ROWS = 200  # Flush buffered message logs after this many rows...
+LOG_FLUSH_INTERVAL_MS = 500  # ...or after this many milliseconds
+CACHE_CHECK_INTERVAL_SECONDS = 5.0  # How often cached tables look for changes by other processes
+
+# Outbound Flood Control (Telegram limits)
+OUTBOUND_GLOBAL_PER_SECOND = 30  # Bot API calls per second across all chats
+OUTBOUND_CHANNEL_PER_MINUTE = 20  # Posts per minute to the channel
+OUTBOUND_CHAT_PER_SECOND = 1  # Messages per second to a single private chat
+OUTBOUND_MAX_RETRIES = 3  # Retries of one call after RetryAfter before giving up
+OUTBOUND_IDLE_SECONDS = 60  # Idle time before a destination's queue is released
+FANOUT_CONCURRENCY = 8  # Chats contacted at once when messaging every admin
+FANOUT_TIMEOUT_SECONDS = 15  # Per-chat timeout for one attempt's API call, excluding queueing
+FANOUT_RETRIES = 2  # Extra attempts for a chat after a timeout or network error
+APPROVAL_RENOTIFY_SECONDS = 60  # Delay before retrying an approval prompt no admin received; doubles each round
+APPROVAL_RENOTIFY_ROUNDS = 5  # Retry rounds before the prompt is left to the admins' pending list
+
+# Channel Outbox
+OUTBOX_BATCH_SIZE = 10  # Posts claimed by the publisher at a time
+OUTBOX_LEASE_SECONDS = 300  # A claimed post is retried if not settled within this time
+OUTBOX_POLL_SECONDS = 5  # How often the publisher looks for due retries when idle
+OUTBOX_MAX_ATTEMPTS = 8  # Attempts before a post is marked as failed
+OUTBOX_BACKOFF_BASE_SECONDS = 2  # Retry delay doubles from this value after each failure...
+OUTBOX_BACKOFF_MAX_SECONDS = 600  # ...up to this cap
+OUTBOX_RETENTION_DAYS = 7  # Settled posts are deleted after this many days
+INSTANCE_ID = os.getenv("BOT_INSTANCE_ID") or socket.gethostname()  # Owner of this process's outbox leases; unique per instance sharing the database
+DECIDED_MEDIA_RETENTION_DAYS = 7  # Approved or rejected media rows are deleted after this many days
+PRUNE_INTERVAL_SECONDS = 3600  # How often settled outbox posts and decided media are pruned
+
+# Albums
+ALBUM_WINDOW_SECONDS = 1.5  # An album is complete once no item arrived for this long
+
+# Duplicate Media
+DUPLICATE_MEDIA_WINDOW_DAYS = 30  # Resubmitted files reuse a moderation decision this recent
+FINGERPRINT_WINDOW_HOURS = 6  # Text posts are rejected if a near duplicate was posted this recently
+FINGERPRINT_MAX_ENTRIES = 100000  # Recent post fingerprints kept in memory
+FINGERPRINT_MIN_SIMILARITY = 0.6  # Estimated shingle overlap (Jaccard) at which posts are near duplicates
+FINGERPRINT_SHINGLE_SIZE = 3  # Characters per shingle
+FINGERPRINT_MIN_LENGTH = 20  # Shorter posts (after normalization) are not checked
+
+# Conversation States
+CONVERSATION_STATE_TTL_SECONDS = 900  # An unanswered prompt is forgotten after this long
+CONVERSATION_STATE_MAX_ENTRIES = 10000  # Least recently used prompts beyond this are dropped
+CONVERSATION_STATE_PERSIST_SECONDS = 30  # How often changed prompts are saved to the database
 
 # Default Settings
 DEFAULT_RATE_LIMIT_MINUTES = 5
+RATE_LIMIT_BURST = 1  # Messages a user may send back to back before the rate limit applies
+RATE_LIMIT_PERSIST_SECONDS = 30  # How often rate limiter state is saved to the database
 DEFAULT_ACTIVITY_START_HOUR = 0  # 24-hour format
 DEFAULT_ACTIVITY_END_HOUR = 23
 DEFAULT_REQUIRE_APPROVAL = True
+DEFAULT_DISPLAY_NAME_PREFIX = "کاربر"  # New users are named <prefix><row id>
 
 # Default Profanity Words (Persian and English)
 DEFAULT_PROFANITY_WORDS = [
@@ -65,9 +127,11 @@ MESSAGES = {
     
     "message_sent": "✅ پیام شما در کانال منتشر شد!\n🔗 مشاهده: @{}",
     "message_filtered": "❌ پیام شما حاوی کلمات نامناسب است و ارسال نشد.",
+    "message_duplicate": "❌ پیام مشابهی اخیراً در کانال منتشر شده است و پیام شما ارسال نشد.",
     "media_sent_for_review": "📋 رسانه شما برای بررسی ارسال شد. نتیجه به زودی اطلاع داده می‌شود.",
     "media_approved": "✅ رسانه شما تأیید و در کانال منتشر شد!\n🔗 مشاهده: @{}",
     "media_rejected": "❌ رسانه شما رد شد.\n📝 دلیل: {}",
+    "media_already_pending": "📋 این رسانه قبلاً برای بررسی ارسال شده و در انتظار تأیید است.",
     
     "rate_limited": "⏰ شما اخیراً پیام ارسال کرده‌اید. لطفاً {} دقیقه صبر کنید.",
     "channel_inactive": "😴 کانال در حال حاضر غیرفعال است. ساعات فعالیت: {}:00 تا {}:00",
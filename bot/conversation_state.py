@@ -0,0 +1,143 @@
+"""
+Bounded store for users' pending multi-step prompts
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Tuple
+
+from bot.config import CONVERSATION_STATE_TTL_SECONDS, CONVERSATION_STATE_MAX_ENTRIES
+from bot.database import load_conversation_states, save_conversation_states
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+class ConversationStateStore:
+    """Dict-like map from user to the prompt they are expected to answer
+
+    Every entry expires ``ttl_seconds`` after it was last set or read, and
+    setting or reading an entry also moves it to the back of the order.
+    The front of the order is therefore both the least recently used and
+    the soonest to expire entry, so expired entries are removed by popping
+    from the front instead of scanning the store, and the least recently
+    used ones are dropped beyond ``max_entries``. Changes are tracked so
+    they can be saved lazily by ``persist_conversation_states``.
+    """
+
+    def __init__(self, ttl_seconds: float = CONVERSATION_STATE_TTL_SECONDS,
+                 max_entries: int = CONVERSATION_STATE_MAX_ENTRIES):
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+        # key -> (state, monotonic expiry time), soonest to expire first
+        self._entries: "OrderedDict[Hashable, Tuple[str, float]]" = OrderedDict()
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float):
+        entries = self._entries
+        while entries:
+            key, (_, expires_at) = next(iter(entries.items()))
+            if expires_at > now and len(entries) <= self._max_entries:
+                break
+            del entries[key]
+            self._dirty.add(key)
+
+    def get(self, key: Hashable, default=None):
+        """Get a user's state and extend its lifetime"""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            self._entries[key] = (entry[0], now + self._ttl_seconds)
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def pop(self, key: Hashable, default=_MISSING):
+        """Remove a user's state and return it"""
+        with self._lock:
+            self._expire(time.monotonic())
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                if default is _MISSING:
+                    raise KeyError(key)
+                return default
+            self._dirty.add(key)
+            return entry[0]
+
+    def __getitem__(self, key: Hashable) -> str:
+        state = self.get(key, _MISSING)
+        if state is _MISSING:
+            raise KeyError(key)
+        return state
+
+    def __setitem__(self, key: Hashable, state: str):
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = (state, now + self._ttl_seconds)
+            self._entries.move_to_end(key)
+            self._dirty.add(key)
+            self._expire(now)
+
+    def __delitem__(self, key: Hashable):
+        self.pop(key)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            self._expire(time.monotonic())
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire(time.monotonic())
+            return len(self._entries)
+
+    def export_dirty(self) -> Tuple[List[Tuple[Hashable, str, float]], List[Hashable]]:
+        """Get (key, state, wall-clock expiry) rows and removed keys changed since the last export"""
+        now = time.monotonic()
+        wall_now = time.time()
+        with self._lock:
+            self._expire(now)
+            upserts = []
+            removed = []
+            for key in self._dirty:
+                entry = self._entries.get(key)
+                if entry is None:
+                    removed.append(key)
+                else:
+                    upserts.append((key, entry[0], wall_now + (entry[1] - now)))
+            self._dirty.clear()
+        return upserts, removed
+
+    def load(self, rows: List[Tuple[Hashable, str, float]]):
+        """Restore states saved by export_dirty, converting wall-clock expiry times back"""
+        now = time.monotonic()
+        wall_now = time.time()
+        with self._lock:
+            for key, state, expires_at in sorted(rows, key=lambda row: row[2]):
+                if expires_at > wall_now:
+                    self._entries[key] = (state, now + (expires_at - wall_now))
+                    self._entries.move_to_end(key)
+            self._expire(now)
+
+_store: Optional[ConversationStateStore] = None
+
+def get_conversation_states() -> ConversationStateStore:
+    """Get the shared conversation state store"""
+    global _store
+    if _store is None:
+        _store = ConversationStateStore()
+    return _store
+
+def persist_conversation_states():
+    """Save changed states and delete removed and expired ones"""
+    upserts, removed = get_conversation_states().export_dirty()
+    save_conversation_states(upserts, removed, time.time())
+
+def restore_conversation_states():
+    """Load saved states so pending prompts survive a restart"""
+    get_conversation_states().load(load_conversation_states(time.time()))
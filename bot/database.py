@@ -2,89 +2,145 @@
 Database operations for the bot
 """
 
+import hashlib
 import sqlite3
 import logging
+import threading
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import List, Optional, Tuple
-from bot.config import DATABASE_PATH, DEFAULT_PROFANITY_WORDS, DEFAULT_RATE_LIMIT_MINUTES
+from types import MappingProxyType
+from typing import Callable, Dict, FrozenSet, List, Mapping, Optional, Tuple
+from bot.config import (
+    DATABASE_PATH, DEFAULT_PROFANITY_WORDS, DEFAULT_RATE_LIMIT_MINUTES, DEFAULT_DISPLAY_NAME_PREFIX,
+    DEFAULT_ACTIVITY_START_HOUR, DEFAULT_ACTIVITY_END_HOUR, CACHE_CHECK_INTERVAL_SECONDS,
+    DB_BUSY_TIMEOUT_SECONDS, DB_CACHE_SIZE_KB, DB_MMAP_SIZE_BYTES, DB_STATEMENT_CACHE_SIZE,
+    LOG_FLUSH_MAX_ROWS, LOG_FLUSH_INTERVAL_MS
+)
+from bot.log_writer import MessageLogWriter
+from bot.migrations import run_migrations
 
 logger = logging.getLogger(__name__)
 
-def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(DATABASE_PATH)
+# Long-lived connections, one per thread. Connections are opened lazily and
+# kept for the lifetime of the thread so the page cache and the statement
+# cache stay warm between calls.
+_local = threading.local()
+_connections: List[sqlite3.Connection] = []
+_connections_lock = threading.Lock()
+_generation = 0
+# Called with the text of every statement run on a pooled connection, if set
+_statement_tracer: Optional[Callable[[str], None]] = None
+
+def _open_connection() -> sqlite3.Connection:
+    """Open a new connection and apply the per-connection tuning once"""
+    # check_same_thread is disabled only so close_db_connections() can close
+    # every pooled connection at shutdown; each one is still used by a single thread
+    conn = sqlite3.connect(
+        DATABASE_PATH,
+        timeout=DB_BUSY_TIMEOUT_SECONDS,
+        cached_statements=DB_STATEMENT_CACHE_SIZE,
+        check_same_thread=False
+    )
     conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute(f'PRAGMA cache_size = {-int(DB_CACHE_SIZE_KB)}')
+    conn.execute(f'PRAGMA mmap_size = {int(DB_MMAP_SIZE_BYTES)}')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    if _statement_tracer is not None:
+        conn.set_trace_callback(_statement_tracer)
+    return conn
+
+def set_statement_tracer(tracer: Optional[Callable[[str], None]]):
+    """Call tracer with every statement run on pooled connections (None to stop)
+
+    Applies to open and future connections. Meant for benchmarks and
+    debugging; it slows every statement down.
+    """
+    global _statement_tracer
+    with _connections_lock:
+        _statement_tracer = tracer
+        for conn in _connections:
+            conn.set_trace_callback(tracer)
+
+def get_db_connection():
+    """Get the calling thread's pooled database connection"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None or getattr(_local, 'generation', None) != _generation:
+        conn = _open_connection()
+        _local.conn = conn
+        _local.generation = _generation
+        with _connections_lock:
+            _connections.append(conn)
     return conn
 
+def close_db_connections():
+    """Close every pooled connection (used on shutdown)"""
+    global _generation
+    with _connections_lock:
+        _generation += 1
+        for conn in _connections:
+            try:
+                conn.close()
+            except Exception as e:
+                logger.error(f"Error closing database connection: {e}")
+        _connections.clear()
+
+# Small, rarely-changing tables (settings, admins, profanity words) are cached in memory.
+# Each cache is swapped as a whole under this lock and reset to None to
+# force a reload.
+_cache_lock = threading.Lock()
+
+def _invalidate_caches():
+    """Force every cached table to be reloaded on next use"""
+    global _settings, _admins, _profanity_words
+    with _cache_lock:
+        _settings = None
+        _admins = None
+        _profanity_words = None
+
+# Version of each cached table that its cached copy was loaded at. Triggers
+# bump a table's row in cache_versions on every write, by any connection.
+_cache_versions: Dict[str, Optional[int]] = {}
+
+def _read_cache_version(conn: sqlite3.Connection, name: str):
+    """Record the current version of a cached table; call with _cache_lock held
+
+    Read before the table's rows, so a write in between leads to one
+    redundant reload rather than a missed change.
+    """
+    row = conn.execute('SELECT version FROM cache_versions WHERE name = ?', (name,)).fetchone()
+    _cache_versions[name] = row[0] if row else None
+
+def _check_external_changes(conn: sqlite3.Connection):
+    """Drop cached tables that another connection or process has changed
+
+    Only a cache whose own table changed is dropped; commits to other
+    tables, such as the message log writer's, leave the caches alone. It is
+    polled at most every CACHE_CHECK_INTERVAL_SECONDS per thread; changes
+    made through this module update the caches directly.
+    """
+    global _settings, _admins, _profanity_words
+    now = time.monotonic()
+    if now - getattr(_local, 'checked_at', float('-inf')) < CACHE_CHECK_INTERVAL_SECONDS:
+        return
+    _local.checked_at = now
+    versions = dict(conn.execute('SELECT name, version FROM cache_versions').fetchall())
+    with _cache_lock:
+        if versions.get('settings') != _cache_versions.get('settings'):
+            _settings = None
+        if versions.get('admins') != _cache_versions.get('admins'):
+            _admins = None
+        if versions.get('profanity_words') != _cache_versions.get('profanity_words'):
+            _profanity_words = None
+
 def init_database():
     """Initialize the database with required tables"""
     conn = get_db_connection()
     try:
-        # Users table
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                telegram_id INTEGER UNIQUE NOT NULL,
-                display_name TEXT UNIQUE,
-                display_name_set BOOLEAN DEFAULT FALSE,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                last_message_at TIMESTAMP
-            )
-        ''')
-        
-        # Admins table
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS admins (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                telegram_id INTEGER UNIQUE NOT NULL,
-                added_by INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Profanity words table
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS profanity_words (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                word TEXT UNIQUE NOT NULL,
-                added_by INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Settings table
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS settings (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Pending media table
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS pending_media (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_telegram_id INTEGER NOT NULL,
-                message_id INTEGER NOT NULL,
-                file_id TEXT NOT NULL,
-                file_type TEXT NOT NULL,
-                caption TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Message logs table
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS message_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_telegram_id INTEGER NOT NULL,
-                message_type TEXT NOT NULL,
-                status TEXT NOT NULL,
-                reason TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        # Create or upgrade the schema
+        run_migrations(conn)
         
         # Initialize default settings
         default_settings = [
@@ -115,13 +171,12 @@ def init_database():
             ''', (123456789, 0))  # This should be replaced with real admin ID
         
         conn.commit()
+        _invalidate_caches()
         logger.info("Database initialized successfully")
         
     except Exception as e:
         logger.error(f"Error initializing database: {e}")
         conn.rollback()
-    finally:
-        conn.close()
 
 def get_or_create_user(telegram_id: int) -> dict:
     """Get existing user or create new one"""
@@ -135,28 +190,23 @@ def get_or_create_user(telegram_id: int) -> dict:
         if user:
             return dict(user)
         
-        # Create new user with auto-generated display name
-        cursor = conn.execute('''
-            SELECT COUNT(*) as count FROM users
-        ''')
-        result = cursor.fetchone()
-        user_count = result['count'] if result else 0
-        display_name = f"کاربر{user_count + 1}"
-        
-        # Ensure uniqueness
-        while True:
-            existing = conn.execute('''
-                SELECT id FROM users WHERE display_name = ?
-            ''', (display_name,)).fetchone()
-            
-            if not existing:
-                break
-            user_count += 1
-            display_name = f"کاربر{user_count + 1}"
-        
-        conn.execute('''
-            INSERT INTO users (telegram_id, display_name) VALUES (?, ?)
-        ''', (telegram_id, display_name))
+        # Create new user with an auto-generated display name taken from the
+        # row id it is about to receive. The name is allocated inside the
+        # insert itself, so it costs one statement and cannot race with
+        # other new users.
+        try:
+            conn.execute('''
+                INSERT INTO users (telegram_id, display_name)
+                VALUES (?, ? || (COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'users'), 0) + 1))
+                ON CONFLICT (telegram_id) DO NOTHING
+            ''', (telegram_id, DEFAULT_DISPLAY_NAME_PREFIX))
+        except sqlite3.IntegrityError:
+            # The default name is already used by a name picked before default
+            # names were reserved; fall back to one keyed by the telegram ID
+            conn.execute('''
+                INSERT INTO users (telegram_id, display_name) VALUES (?, ?)
+                ON CONFLICT (telegram_id) DO NOTHING
+            ''', (telegram_id, f"{DEFAULT_DISPLAY_NAME_PREFIX}_{telegram_id}"))
         conn.commit()
         
         # Return the new user
@@ -173,8 +223,6 @@ def get_or_create_user(telegram_id: int) -> dict:
         logger.error(f"Error getting/creating user: {e}")
         conn.rollback()
         return {}
-    finally:
-        conn.close()
 
 def set_user_display_name(telegram_id: int, display_name: str) -> bool:
     """Set user display name (only once)"""
@@ -211,75 +259,73 @@ def set_user_display_name(telegram_id: int, display_name: str) -> bool:
         logger.error(f"Error setting display name: {e}")
         conn.rollback()
         return False
-    finally:
-        conn.close()
 
-def update_last_message_time(telegram_id: int):
-    """Update user's last message time"""
+def save_rate_limit_state(rows, expired_before: float):
+    """Upsert rate limiter buckets and delete the ones that have fully refilled"""
     conn = get_db_connection()
     try:
+        conn.executemany('''
+            INSERT INTO rate_limits (telegram_id, tokens, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT (telegram_id) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at
+        ''', rows)
         conn.execute('''
-            UPDATE users SET last_message_at = CURRENT_TIMESTAMP 
-            WHERE telegram_id = ?
-        ''', (telegram_id,))
+            DELETE FROM rate_limits WHERE updated_at < ?
+        ''', (expired_before,))
         conn.commit()
     except Exception as e:
-        logger.error(f"Error updating last message time: {e}")
+        logger.error(f"Error saving rate limit state: {e}")
         conn.rollback()
-    finally:
-        conn.close()
 
-def can_user_send_message(telegram_id: int) -> bool:
-    """Check if user can send message based on rate limiting"""
+def load_rate_limit_state(expired_before: float) -> List[Tuple[int, float, float]]:
+    """Get saved rate limiter buckets that have not refilled yet"""
     conn = get_db_connection()
     try:
-        # Get rate limit setting
-        rate_limit = conn.execute('''
-            SELECT value FROM settings WHERE key = 'rate_limit_minutes'
-        ''').fetchone()
-        
-        if not rate_limit:
-            return True
-        
-        rate_limit_minutes = int(rate_limit['value'])
-        
-        # Get user's last message time
-        user = conn.execute('''
-            SELECT last_message_at FROM users WHERE telegram_id = ?
-        ''', (telegram_id,)).fetchone()
-        
-        if not user or not user['last_message_at']:
-            return True
-        
-        last_message = datetime.fromisoformat(user['last_message_at'])
-        time_diff = datetime.now() - last_message
-        
-        return time_diff.total_seconds() >= (rate_limit_minutes * 60)
-        
+        rows = conn.execute('''
+            SELECT telegram_id, tokens, updated_at FROM rate_limits WHERE updated_at >= ?
+        ''', (expired_before,)).fetchall()
+        return [(row['telegram_id'], row['tokens'], row['updated_at']) for row in rows]
     except Exception as e:
-        logger.error(f"Error checking rate limit: {e}")
-        return True
-    finally:
-        conn.close()
+        logger.error(f"Error loading rate limit state: {e}")
+        return []
+
+def save_conversation_states(rows, removed, expired_before: float):
+    """Upsert conversation states and delete removed and expired ones"""
+    conn = get_db_connection()
+    try:
+        conn.executemany('''
+            INSERT INTO conversation_states (telegram_id, state, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT (telegram_id) DO UPDATE SET state = excluded.state, expires_at = excluded.expires_at
+        ''', rows)
+        conn.executemany('''
+            DELETE FROM conversation_states WHERE telegram_id = ?
+        ''', [(telegram_id,) for telegram_id in removed])
+        conn.execute('''
+            DELETE FROM conversation_states WHERE expires_at < ?
+        ''', (expired_before,))
+        conn.commit()
+    except Exception as e:
+        logger.error(f"Error saving conversation states: {e}")
+        conn.rollback()
+
+def load_conversation_states(expired_before: float) -> List[Tuple[int, str, float]]:
+    """Get saved conversation states that have not expired yet"""
+    conn = get_db_connection()
+    try:
+        rows = conn.execute('''
+            SELECT telegram_id, state, expires_at FROM conversation_states WHERE expires_at >= ?
+        ''', (expired_before,)).fetchall()
+        return [(row['telegram_id'], row['state'], row['expires_at']) for row in rows]
+    except Exception as e:
+        logger.error(f"Error loading conversation states: {e}")
+        return []
 
 def is_channel_active() -> bool:
     """Check if channel is currently active based on activity hours"""
-    conn = get_db_connection()
     try:
-        start_hour = conn.execute('''
-            SELECT value FROM settings WHERE key = 'activity_start_hour'
-        ''').fetchone()
-        
-        end_hour = conn.execute('''
-            SELECT value FROM settings WHERE key = 'activity_end_hour'
-        ''').fetchone()
-        
-        if not start_hour or not end_hour:
-            return True
-        
+        settings = get_settings()
         current_hour = datetime.now().hour
-        start = int(start_hour['value'])
-        end = int(end_hour['value'])
+        start = settings.activity_start_hour
+        end = settings.activity_end_hour
         
         if start <= end:
             return start <= current_hour <= end
@@ -289,22 +335,43 @@ def is_channel_active() -> bool:
     except Exception as e:
         logger.error(f"Error checking channel activity: {e}")
         return True
-    finally:
-        conn.close()
 
-def is_admin(telegram_id: int) -> bool:
-    """Check if user is admin"""
-    conn = get_db_connection()
+# Admin IDs in the order they were added, plus a frozenset for lookups
+_admins: Optional[Tuple[Tuple[int, ...], FrozenSet[int]]] = None
+
+def _reload_admins(conn: sqlite3.Connection) -> Tuple[Tuple[int, ...], FrozenSet[int]]:
+    """Read the admins table and swap in a new cached admin set"""
+    global _admins
+    with _cache_lock:
+        _read_cache_version(conn, 'admins')
+        rows = conn.execute('''
+            SELECT telegram_id FROM admins ORDER BY created_at
+        ''').fetchall()
+        ordered = tuple(row['telegram_id'] for row in rows)
+        _admins = (ordered, frozenset(ordered))
+        return _admins
+
+def _get_admins() -> Tuple[Tuple[int, ...], FrozenSet[int]]:
+    """Get the cached admins, loading them on first use"""
+    admins = _admins
     try:
-        admin = conn.execute('''
-            SELECT id FROM admins WHERE telegram_id = ?
-        ''', (telegram_id,)).fetchone()
-        return admin is not None
+        conn = get_db_connection()
+        _check_external_changes(conn)
+        admins = _admins
+        if admins is None:
+            admins = _reload_admins(conn)
+        return admins
     except Exception as e:
-        logger.error(f"Error checking admin status: {e}")
-        return False
-    finally:
-        conn.close()
+        logger.error(f"Error loading admins: {e}")
+        return admins or ((), frozenset())
+
+def get_admin_ids() -> FrozenSet[int]:
+    """Get the set of admin telegram IDs"""
+    return _get_admins()[1]
+
+def is_admin(telegram_id: int) -> bool:
+    """Check if user is admin"""
+    return telegram_id in get_admin_ids()
 
 def add_admin(telegram_id: int, added_by: int) -> bool:
     """Add new admin"""
@@ -314,13 +381,12 @@ def add_admin(telegram_id: int, added_by: int) -> bool:
             INSERT OR IGNORE INTO admins (telegram_id, added_by) VALUES (?, ?)
         ''', (telegram_id, added_by))
         conn.commit()
+        _reload_admins(conn)
         return True
     except Exception as e:
         logger.error(f"Error adding admin: {e}")
         conn.rollback()
         return False
-    finally:
-        conn.close()
 
 def remove_admin(telegram_id: int) -> bool:
     """Remove admin"""
@@ -330,27 +396,47 @@ def remove_admin(telegram_id: int) -> bool:
             DELETE FROM admins WHERE telegram_id = ?
         ''', (telegram_id,))
         conn.commit()
+        _reload_admins(conn)
         return cursor.rowcount > 0
     except Exception as e:
         logger.error(f"Error removing admin: {e}")
         conn.rollback()
         return False
-    finally:
-        conn.close()
 
-def get_profanity_words() -> List[str]:
-    """Get all profanity words"""
-    conn = get_db_connection()
-    try:
+# Profanity words sorted alphabetically. A reload keeps the existing tuple
+# when the words are unchanged, so callers can detect changes by identity.
+_profanity_words: Optional[Tuple[str, ...]] = None
+
+def _reload_profanity_words(conn: sqlite3.Connection) -> Tuple[str, ...]:
+    """Read the profanity_words table and swap in a new cached tuple"""
+    global _profanity_words
+    with _cache_lock:
+        _read_cache_version(conn, 'profanity_words')
         words = conn.execute('''
             SELECT word FROM profanity_words ORDER BY word
         ''').fetchall()
-        return [word['word'] for word in words]
+        words = tuple(word['word'] for word in words)
+        if words != _profanity_words:
+            _profanity_words = words
+        return _profanity_words
+
+def get_profanity_word_tuple() -> Tuple[str, ...]:
+    """Get the cached profanity words, loading them on first use"""
+    words = _profanity_words
+    try:
+        conn = get_db_connection()
+        _check_external_changes(conn)
+        words = _profanity_words
+        if words is None:
+            words = _reload_profanity_words(conn)
+        return words
     except Exception as e:
         logger.error(f"Error getting profanity words: {e}")
-        return []
-    finally:
-        conn.close()
+        return words or ()
+
+def get_profanity_words() -> List[str]:
+    """Get all profanity words"""
+    return list(get_profanity_word_tuple())
 
 def add_profanity_word(word: str, added_by: int) -> bool:
     """Add profanity word"""
@@ -360,13 +446,12 @@ def add_profanity_word(word: str, added_by: int) -> bool:
             INSERT OR IGNORE INTO profanity_words (word, added_by) VALUES (?, ?)
         ''', (word.lower(), added_by))
         conn.commit()
+        _reload_profanity_words(conn)
         return True
     except Exception as e:
         logger.error(f"Error adding profanity word: {e}")
         conn.rollback()
         return False
-    finally:
-        conn.close()
 
 def remove_profanity_word(word: str) -> bool:
     """Remove profanity word"""
@@ -376,27 +461,69 @@ def remove_profanity_word(word: str) -> bool:
             DELETE FROM profanity_words WHERE word = ?
         ''', (word.lower(),))
         conn.commit()
+        _reload_profanity_words(conn)
         return cursor.rowcount > 0
     except Exception as e:
         logger.error(f"Error removing profanity word: {e}")
         conn.rollback()
         return False
-    finally:
-        conn.close()
 
-def get_setting(key: str) -> str:
-    """Get setting value"""
-    conn = get_db_connection()
+@dataclass(frozen=True)
+class Settings:
+    """Typed, immutable snapshot of the settings table"""
+    require_approval: bool
+    rate_limit_minutes: int
+    activity_start_hour: int
+    activity_end_hour: int
+    values: Mapping[str, str]
+
+    @classmethod
+    def from_values(cls, values: Dict[str, str]) -> 'Settings':
+        """Build a snapshot from raw key/value rows, falling back to defaults"""
+        def as_int(key: str, default: int) -> int:
+            try:
+                return int(values[key])
+            except (KeyError, ValueError):
+                return default
+
+        return cls(
+            require_approval=values.get('require_approval', 'true') == 'true',
+            rate_limit_minutes=as_int('rate_limit_minutes', DEFAULT_RATE_LIMIT_MINUTES),
+            activity_start_hour=as_int('activity_start_hour', DEFAULT_ACTIVITY_START_HOUR),
+            activity_end_hour=as_int('activity_end_hour', DEFAULT_ACTIVITY_END_HOUR),
+            values=MappingProxyType(dict(values))
+        )
+
+# Process-wide settings snapshot. It is replaced as a whole (never mutated),
+# so readers always see a consistent set of values.
+_settings: Optional[Settings] = None
+
+def _reload_settings(conn: sqlite3.Connection) -> Settings:
+    """Read the settings table and swap in a new snapshot"""
+    global _settings
+    with _cache_lock:
+        _read_cache_version(conn, 'settings')
+        rows = conn.execute('SELECT key, value FROM settings').fetchall()
+        _settings = Settings.from_values({row['key']: row['value'] for row in rows})
+        return _settings
+
+def get_settings() -> Settings:
+    """Get the cached settings snapshot, loading it on first use"""
+    settings = _settings
     try:
-        setting = conn.execute('''
-            SELECT value FROM settings WHERE key = ?
-        ''', (key,)).fetchone()
-        return setting['value'] if setting else ""
+        conn = get_db_connection()
+        _check_external_changes(conn)
+        settings = _settings
+        if settings is None:
+            settings = _reload_settings(conn)
+        return settings
     except Exception as e:
-        logger.error(f"Error getting setting: {e}")
-        return ""
-    finally:
-        conn.close()
+        logger.error(f"Error loading settings: {e}")
+        return settings or Settings.from_values({})
+
+def get_setting(key: str) -> str:
+    """Get setting value"""
+    return get_settings().values.get(key, "")
 
 def set_setting(key: str, value: str) -> bool:
     """Set setting value"""
@@ -407,31 +534,30 @@ def set_setting(key: str, value: str) -> bool:
             VALUES (?, ?, CURRENT_TIMESTAMP)
         ''', (key, value))
         conn.commit()
+        _reload_settings(conn)
         return True
     except Exception as e:
         logger.error(f"Error setting value: {e}")
         conn.rollback()
         return False
-    finally:
-        conn.close()
 
 def add_pending_media(user_telegram_id: int, message_id: int, file_id: str, 
-                     file_type: str, caption: str = None) -> int:
-    """Add pending media for approval"""
+                     file_type: str, caption: str = None, items: str = None,
+                     file_unique_id: str = None) -> int:
+    """Add pending media for approval (items is the JSON item list of an album)"""
     conn = get_db_connection()
     try:
         cursor = conn.execute('''
-            INSERT INTO pending_media (user_telegram_id, message_id, file_id, file_type, caption)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (user_telegram_id, message_id, file_id, file_type, caption))
+            INSERT INTO pending_media (user_telegram_id, message_id, file_id, file_type, caption, items,
+                                       file_unique_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (user_telegram_id, message_id, file_id, file_type, caption, items, file_unique_id))
         conn.commit()
         return cursor.lastrowid
     except Exception as e:
         logger.error(f"Error adding pending media: {e}")
         conn.rollback()
         return None
-    finally:
-        conn.close()
 
 def get_pending_media(media_id: int) -> dict:
     """Get pending media by ID"""
@@ -444,8 +570,6 @@ def get_pending_media(media_id: int) -> dict:
     except Exception as e:
         logger.error(f"Error getting pending media: {e}")
         return None
-    finally:
-        conn.close()
 
 def remove_pending_media(media_id: int) -> bool:
     """Remove pending media"""
@@ -460,34 +584,291 @@ def remove_pending_media(media_id: int) -> bool:
         logger.error(f"Error removing pending media: {e}")
         conn.rollback()
         return False
-    finally:
-        conn.close()
 
-def log_message(user_telegram_id: int, message_type: str, status: str, reason: str = None):
-    """Log message activity"""
+def enqueue_channel_post(user_telegram_id: int, message_type: str, text: str,
+                         file_id: str = None, source: str = 'direct', items: str = None) -> Optional[int]:
+    """Add a channel post to the outbox; returns the outbox ID"""
     conn = get_db_connection()
     try:
-        conn.execute('''
-            INSERT INTO message_logs (user_telegram_id, message_type, status, reason)
-            VALUES (?, ?, ?, ?)
-        ''', (user_telegram_id, message_type, status, reason))
+        cursor = conn.execute('''
+            INSERT INTO outbox (user_telegram_id, message_type, source, text, file_id, items)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (user_telegram_id, message_type, source, text, file_id, items))
         conn.commit()
+        return cursor.lastrowid
     except Exception as e:
-        logger.error(f"Error logging message: {e}")
+        logger.error(f"Error adding channel post to outbox: {e}")
         conn.rollback()
-    finally:
-        conn.close()
+        return None
 
-def get_all_admins() -> List[int]:
-    """Get all admin telegram IDs"""
+def decide_pending_media(media_id: int, admin_id: int, decision: str,
+                         build_channel_text: Callable[[dict], str] = None) -> Tuple[bool, Optional[dict]]:
+    """Atomically record a moderation decision ('approved' or 'rejected')
+
+    Only the first decision for an item wins: its state moves away from
+    'pending' in one conditional update, and for an approval the channel
+    post built by build_channel_text is added to the outbox in the same
+    transaction. The item's approval prompts are taken in that transaction
+    too and returned as media['prompts'], a list of (chat_id, message_id).
+    Returns (claimed, media). media is None if the item does not exist;
+    claimed is False if another decision was recorded first, in which case
+    media holds that decision.
+    """
     conn = get_db_connection()
     try:
-        admins = conn.execute('''
-            SELECT telegram_id FROM admins ORDER BY created_at
-        ''').fetchall()
-        return [admin['telegram_id'] for admin in admins]
+        rows = conn.execute('''
+            UPDATE pending_media SET state = ?, decided_by = ?, decided_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND state = 'pending'
+            RETURNING *
+        ''', (decision, admin_id, media_id)).fetchall()
+        
+        if not rows:
+            conn.rollback()
+            media = conn.execute('''
+                SELECT * FROM pending_media WHERE id = ?
+            ''', (media_id,)).fetchone()
+            return False, dict(media) if media else None
+        
+        media = dict(rows[0])
+        if decision == 'approved':
+            user = conn.execute('''
+                SELECT display_name FROM users WHERE telegram_id = ?
+            ''', (media['user_telegram_id'],)).fetchone()
+            media['display_name'] = user['display_name'] if user else f"{DEFAULT_DISPLAY_NAME_PREFIX}_{media['user_telegram_id']}"
+            cursor = conn.execute('''
+                INSERT INTO outbox (user_telegram_id, message_type, source, text, file_id, items)
+                VALUES (?, ?, 'approval', ?, ?, ?)
+            ''', (media['user_telegram_id'], media['file_type'], build_channel_text(media),
+                  media['file_id'], media['items']))
+            media['outbox_id'] = cursor.lastrowid
+        
+        if media['file_unique_id']:
+            conn.execute('''
+                INSERT INTO media_history (file_unique_id, decision, caption_hash) VALUES (?, ?, ?)
+                ON CONFLICT (file_unique_id) DO UPDATE SET decision = excluded.decision,
+                    caption_hash = excluded.caption_hash, decided_at = CURRENT_TIMESTAMP
+            ''', (media['file_unique_id'], decision, _caption_hash(media['caption'])))
+        
+        prompts = conn.execute('''
+            DELETE FROM approval_prompts WHERE media_id = ? RETURNING chat_id, message_id
+        ''', (media_id,)).fetchall()
+        media['prompts'] = [(row['chat_id'], row['message_id']) for row in prompts]
+        conn.commit()
+        return True, media
+    except Exception as e:
+        logger.error(f"Error deciding pending media: {e}")
+        conn.rollback()
+        return False, None
+
+def record_approval_prompts(media_id: int, prompts: List[Tuple[int, int]]) -> bool:
+    """Store the (chat_id, message_id) of approval prompts sent for pending media
+
+    Returns False if the media was decided before the prompts could be
+    recorded, or if they could not be stored; the caller then has to
+    retract them itself.
+    """
+    conn = get_db_connection()
+    try:
+        state = conn.execute('''
+            SELECT state FROM pending_media WHERE id = ?
+        ''', (media_id,)).fetchone()
+        if not state or state['state'] != 'pending':
+            return False
+        
+        conn.executemany('''
+            INSERT OR REPLACE INTO approval_prompts (media_id, chat_id, message_id) VALUES (?, ?, ?)
+        ''', [(media_id, chat_id, message_id) for chat_id, message_id in prompts])
+        conn.commit()
+        return True
+    except Exception as e:
+        logger.error(f"Error recording approval prompts: {e}")
+        conn.rollback()
+        return False
+
+def _caption_hash(caption: Optional[str]) -> Optional[str]:
+    """Digest of a caption kept in media_history (None for no caption)"""
+    return hashlib.sha256(caption.encode()).hexdigest() if caption else None
+
+def find_media_decision(file_unique_id: str, window_days: int, caption: str = None) -> Optional[str]:
+    """Look up an earlier submission of the same file
+
+    Returns 'pending' if it is still under review, otherwise the moderation
+    decision ('approved' or 'rejected') made within window_days, or None.
+    An approval only carries over to a submission without a caption or with
+    the caption that was approved; a new caption needs a new review.
+    """
+    conn = get_db_connection()
+    try:
+        pending = conn.execute('''
+            SELECT 1 FROM pending_media WHERE file_unique_id = ? AND state = 'pending' LIMIT 1
+        ''', (file_unique_id,)).fetchone()
+        if pending:
+            return 'pending'
+        
+        history = conn.execute('''
+            SELECT decision, caption_hash FROM media_history
+            WHERE file_unique_id = ? AND decided_at >= datetime('now', ?)
+        ''', (file_unique_id, f'-{window_days} days')).fetchone()
+        if not history:
+            return None
+        if history['decision'] == 'approved' and caption and _caption_hash(caption) != history['caption_hash']:
+            return None
+        return history['decision']
+    except Exception as e:
+        logger.error(f"Error looking up media decision: {e}")
+        return None
+
+def prune_media_history(window_days: int) -> int:
+    """Delete moderation decisions older than the duplicate detection window"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute('''
+            DELETE FROM media_history WHERE decided_at < datetime('now', ?)
+        ''', (f'-{window_days} days',))
+        conn.commit()
+        return cursor.rowcount
+    except Exception as e:
+        logger.error(f"Error pruning media history: {e}")
+        conn.rollback()
+        return 0
+
+def prune_decided_media(retention_days: int) -> int:
+    """Delete approved or rejected media older than retention_days"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute('''
+            DELETE FROM pending_media WHERE state != 'pending' AND decided_at < datetime('now', ?)
+        ''', (f'-{retention_days} days',))
+        conn.commit()
+        return cursor.rowcount
     except Exception as e:
-        logger.error(f"Error getting admins: {e}")
+        logger.error(f"Error pruning decided media: {e}")
+        conn.rollback()
+        return 0
+
+def claim_due_outbox(limit: int, lease_seconds: float, owner: str) -> List[dict]:
+    """Lease up to limit due outbox entries to owner, oldest first
+
+    A claimed entry is not returned again until its lease expires, so a
+    publisher that dies mid-send leaves the entry to be retried, and
+    publishers sharing the database never claim the same entry at once.
+    """
+    conn = get_db_connection()
+    now = time.time()
+    try:
+        rows = conn.execute('''
+            UPDATE outbox SET next_attempt_at = ?, leased_by = ?
+            WHERE id IN (
+                SELECT id FROM outbox WHERE state = 'pending' AND next_attempt_at <= ?
+                ORDER BY id LIMIT ?
+            )
+            RETURNING *
+        ''', (now + lease_seconds, owner, now, limit)).fetchall()
+        conn.commit()
+        return sorted((dict(row) for row in rows), key=lambda row: row['id'])
+    except Exception as e:
+        logger.error(f"Error claiming outbox entries: {e}")
+        conn.rollback()
         return []
-    finally:
-        conn.close()
+
+def release_outbox_leases(owner: str) -> int:
+    """Make owner's undelivered outbox entries due now; returns how many there are
+
+    Entries leased by other instances are left alone: they may still be
+    publishing them, and their leases expire on their own if not.
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute('''
+            UPDATE outbox SET next_attempt_at = 0
+            WHERE state = 'pending' AND (leased_by = ? OR leased_by IS NULL)
+        ''', (owner,))
+        conn.commit()
+        return cursor.rowcount
+    except Exception as e:
+        logger.error(f"Error releasing outbox leases: {e}")
+        conn.rollback()
+        return 0
+
+def mark_outbox_delivered(outbox_id: int, channel_message_id: int):
+    """Record that an outbox entry was published to the channel"""
+    conn = get_db_connection()
+    try:
+        conn.execute('''
+            UPDATE outbox SET state = 'delivered', attempts = attempts + 1, channel_message_id = ?,
+                finished_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (channel_message_id, outbox_id))
+        conn.commit()
+    except Exception as e:
+        logger.error(f"Error marking outbox entry delivered: {e}")
+        conn.rollback()
+
+def mark_outbox_retry(outbox_id: int, error: str, next_attempt_at: float):
+    """Record a failed attempt and schedule the next one"""
+    conn = get_db_connection()
+    try:
+        conn.execute('''
+            UPDATE outbox SET attempts = attempts + 1, last_error = ?, next_attempt_at = ?
+            WHERE id = ?
+        ''', (error, next_attempt_at, outbox_id))
+        conn.commit()
+    except Exception as e:
+        logger.error(f"Error scheduling outbox retry: {e}")
+        conn.rollback()
+
+def mark_outbox_failed(outbox_id: int, error: str):
+    """Give up on an outbox entry"""
+    conn = get_db_connection()
+    try:
+        conn.execute('''
+            UPDATE outbox SET state = 'failed', attempts = attempts + 1, last_error = ?,
+                finished_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (error, outbox_id))
+        conn.commit()
+    except Exception as e:
+        logger.error(f"Error marking outbox entry failed: {e}")
+        conn.rollback()
+
+def prune_outbox(retention_days: int) -> int:
+    """Delete settled outbox entries older than retention_days"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute('''
+            DELETE FROM outbox WHERE state != 'pending' AND finished_at < datetime('now', ?)
+        ''', (f'-{retention_days} days',))
+        conn.commit()
+        return cursor.rowcount
+    except Exception as e:
+        logger.error(f"Error pruning outbox: {e}")
+        conn.rollback()
+        return 0
+
+def write_message_logs(rows):
+    """Insert a batch of message log rows in a single transaction"""
+    conn = get_db_connection()
+    try:
+        conn.executemany('''
+            INSERT INTO message_logs (user_telegram_id, message_type, status, reason, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', rows)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+_log_writer = MessageLogWriter(write_message_logs, LOG_FLUSH_MAX_ROWS, LOG_FLUSH_INTERVAL_MS)
+
+def log_message(user_telegram_id: int, message_type: str, status: str, reason: str = None):
+    """Log message activity (buffered, written in batches)"""
+    created_at = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+    _log_writer.enqueue((user_telegram_id, message_type, status, reason, created_at))
+
+def flush_message_logs():
+    """Write all buffered message logs now and stop the background writer"""
+    _log_writer.close()
+
+def get_all_admins() -> List[int]:
+    """Get all admin telegram IDs"""
+    return list(_get_admins()[0])
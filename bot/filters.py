@@ -4,29 +4,116 @@ Profanity filtering functionality
 
 import re
 import logging
-from typing import List
-from bot.database import get_profanity_words
+from typing import Iterable, List, Optional, Pattern, Tuple
+from bot.database import get_profanity_word_tuple
 
 logger = logging.getLogger(__name__)
 
+# Common character substitutions used to bypass filters
+_SUBSTITUTIONS = {
+    '0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't',
+    '@': 'a', '$': 's', '!': 'i', '+': 't', '×': 'x',
+    # Persian number substitutions
+    '۰': 'o', '۱': 'i', '۳': 'e', '۴': 'a', '۵': 's', '۷': 't'
+}
+
+# Arabic code points folded to the Persian letters and digits they stand in for
+_PERSIAN_FOLDING = {
+    'ي': 'ی', 'ى': 'ی', 'ك': 'ک',
+    '٠': '۰', '١': '۱', '٢': '۲', '٣': '۳', '٤': '۴',
+    '٥': '۵', '٦': '۶', '٧': '۷', '٨': '۸', '٩': '۹',
+}
+
+# Characters that can be inserted into a word without changing how it reads:
+# tatweel, zero-width (non-)joiners and spaces, and Arabic diacritics
+_IGNORED = (
+    ['\u0640', '\u200b', '\u200c', '\u200d', '\u2060', '\u0670']
+    + [chr(cp) for cp in range(0x064B, 0x0660)]
+)
+
+# The table covers Latin, Greek, Cyrillic, Arabic/Persian and the general
+# punctuation block (zero-width characters); code points above it are left
+# unchanged by str.translate
+_TABLE_SIZE = 0x2070
+
+def _build_normalization_table() -> list:
+    """Build one str.translate table doing lowercasing, folding and substitutions
+
+    A list indexed by code point is used instead of a dict because
+    str.translate looks up list entries without raising KeyError for the
+    characters that map to themselves.
+    """
+    table = list(range(_TABLE_SIZE))
+    for cp in range(_TABLE_SIZE):
+        char = chr(cp)
+        if char.isspace():
+            table[cp] = ' '
+            continue
+        mapped = _PERSIAN_FOLDING.get(char, char).lower()
+        mapped = ''.join(_SUBSTITUTIONS.get(c, c) for c in mapped)
+        if mapped != char:
+            table[cp] = mapped
+    for char in _IGNORED:
+        table[ord(char)] = None
+    return table
+
+_NORMALIZATION_TABLE = _build_normalization_table()
+
 def normalize_text(text: str) -> str:
     """Normalize text for filtering (remove extra chars, normalize spacing)"""
-    # Remove extra whitespace and normalize
-    text = re.sub(r'\s+', ' ', text.strip())
-    
-    # Common character substitutions used to bypass filters
-    substitutions = {
-        '0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't',
-        '@': 'a', '$': 's', '!': 'i', '+': 't', '×': 'x',
-        # Persian number substitutions
-        '۰': 'o', '۱': 'i', '۳': 'e', '۴': 'a', '۵': 's', '۷': 't'
-    }
-    
-    normalized = text.lower()
-    for old, new in substitutions.items():
-        normalized = normalized.replace(old, new)
-    
-    return normalized
+    # One translate pass does every per-character mapping; split/join then
+    # collapses the whitespace runs it produced
+    return ' '.join(text.translate(_NORMALIZATION_TABLE).split())
+
+# Separators tolerated between the parts of a multi-word entry
+_SEPARATOR = r'[\s\-_\.]*'
+_END = ''
+
+# (word tuple the matcher was built from, compiled matcher)
+_matcher: Optional[Tuple[Tuple[str, ...], Optional[Pattern]]] = None
+
+def _trie_to_regex(node: dict) -> str:
+    """Emit a regex for a token trie, sharing common prefixes between words"""
+    if _END in node:
+        # A shorter word already matches here; longer words add nothing
+        return ''
+    alternatives = [token + _trie_to_regex(child) for token, child in sorted(node.items())]
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return '(?:' + '|'.join(alternatives) + ')'
+
+def build_profanity_matcher(words: Iterable[str]) -> Optional[Pattern]:
+    """Compile the word list into a single pattern
+
+    Each word matches anywhere in the normalized text, with spaces in the word
+    matching any run of separators, exactly as the per-word searches did. The
+    words are merged into a prefix trie first so the regex engine does not
+    retry every word at every position.
+    """
+    trie: dict = {}
+    for word in words:
+        normalized_word = normalize_text(word)
+        if not normalized_word:
+            continue
+        node = trie
+        for char in normalized_word:
+            token = _SEPARATOR if char == ' ' else re.escape(char)
+            node = node.setdefault(token, {})
+        node[_END] = {}
+
+    if not trie:
+        return None
+    return re.compile(_trie_to_regex(trie))
+
+def _get_matcher() -> Optional[Pattern]:
+    """Get the compiled matcher, rebuilding it only when the words themselves changed"""
+    global _matcher
+    words = get_profanity_word_tuple()
+    matcher = _matcher
+    if matcher is None or (matcher[0] is not words and matcher[0] != words):
+        matcher = (words, build_profanity_matcher(words))
+        _matcher = matcher
+    return matcher[1]
 
 def contains_profanity(text: str) -> bool:
     """Check if text contains profanity"""
@@ -34,29 +121,14 @@ def contains_profanity(text: str) -> bool:
         return False
     
     try:
-        # Get profanity words from database
-        profanity_words = get_profanity_words()
-        
-        if not profanity_words:
+        matcher = _get_matcher()
+        if matcher is None:
             return False
         
-        # Normalize the input text
-        normalized_text = normalize_text(text)
-        
-        # Check for each profanity word
-        for word in profanity_words:
-            normalized_word = normalize_text(word)
-            
-            # Check for exact word match (with word boundaries)
-            if re.search(r'\b' + re.escape(normalized_word) + r'\b', normalized_text):
-                logger.info(f"Profanity detected: {word}")
-                return True
-            
-            # Check for word with common separators or without spaces
-            pattern = re.escape(normalized_word).replace(r'\ ', r'[\s\-_\.]*')
-            if re.search(pattern, normalized_text):
-                logger.info(f"Profanity detected (with separators): {word}")
-                return True
+        match = matcher.search(normalize_text(text))
+        if match:
+            logger.info(f"Profanity detected: {match.group(0)}")
+            return True
         
         return False
         
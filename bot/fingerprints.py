@@ -0,0 +1,194 @@
+"""
+Near-duplicate detection for text posts using MinHash signatures
+"""
+
+import logging
+import re
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from bot.config import (
+    FINGERPRINT_WINDOW_HOURS, FINGERPRINT_MAX_ENTRIES, FINGERPRINT_MIN_SIMILARITY,
+    FINGERPRINT_SHINGLE_SIZE, FINGERPRINT_MIN_LENGTH
+)
+from bot.filters import normalize_text
+
+logger = logging.getLogger(__name__)
+
+# A signature has _BANDS * _ROWS minimum values; two posts become candidates
+# when all _ROWS values of any band agree
+_BANDS = 8
+_ROWS = 4
+_BINS = _BANDS * _ROWS
+_BIN_BITS = _BINS.bit_length() - 1
+_VALUE_MASK = (1 << 32) - 1
+_DENSIFY_OFFSET = 0x9E3779B1
+
+_NOT_WORD = re.compile(r'[\W_]+')
+
+Signature = Tuple[int, ...]
+
+def minhash_signature(text: str, shingle_size: int = FINGERPRINT_SHINGLE_SIZE) -> Signature:
+    """One-permutation MinHash of the character shingles of already normalized text
+
+    Every shingle hash is assigned to one of _BINS bins by its low bits and
+    each bin keeps its smallest value, so the signature costs a single pass
+    over the shingles. Bins left empty by short texts borrow the value of
+    the next non-empty bin (rotation densification) so that signatures stay
+    comparable bin by bin. Shingles are hashed with the built-in string
+    hash, which is salted per process; signatures are only comparable
+    within one process.
+    """
+    count = max(1, len(text) - shingle_size + 1)
+    minimums = [None] * _BINS
+    for value in {hash(text[i:i + shingle_size]) for i in range(count)}:
+        index = value & (_BINS - 1)
+        value = (value >> _BIN_BITS) & _VALUE_MASK
+        current = minimums[index]
+        if current is None or value < current:
+            minimums[index] = value
+
+    if None not in minimums:
+        return tuple(minimums)
+
+    # Walk right to left twice so every empty bin sees the nearest filled bin
+    # on its right, wrapping around
+    signature = list(minimums)
+    nearest = None
+    distance = 0
+    for i in reversed(range(2 * _BINS)):
+        value = minimums[i % _BINS]
+        if value is not None:
+            nearest, distance = value, 0
+        else:
+            distance += 1
+            if i < _BINS and nearest is not None:
+                signature[i] = (nearest + distance * _DENSIFY_OFFSET) & _VALUE_MASK
+    return tuple(signature)
+
+def text_signature(text: str) -> Optional[Signature]:
+    """Signature of a post, or None if it is too short to compare reliably
+
+    Case, look-alike characters, spacing and punctuation are ignored.
+    """
+    normalized = _NOT_WORD.sub('', normalize_text(text))
+    if len(normalized) < FINGERPRINT_MIN_LENGTH:
+        return None
+    return minhash_signature(normalized)
+
+def similarity(first: Signature, second: Signature) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures"""
+    return sum(a == b for a, b in zip(first, second)) / _BINS
+
+class FingerprintIndex:
+    """Recent post signatures with lookup of near duplicates
+
+    Each signature is indexed under one key per LSH band, so a lookup costs
+    _BANDS dictionary lookups plus a comparison with each candidate. A band
+    key points at the most recent entry that had it, which keeps the index
+    at one dictionary slot per band per entry. Entries expire after
+    ``window_seconds`` and the oldest ones are evicted beyond
+    ``max_entries``, so memory stays bounded.
+    """
+
+    def __init__(self, window_seconds: float, max_entries: int, min_similarity: float):
+        self._window_seconds = window_seconds
+        self._max_entries = max_entries
+        self._min_similarity = min_similarity
+        # entry id -> (packed signature, time added), oldest first
+        self._entries: "OrderedDict[int, Tuple[bytes, float]]" = OrderedDict()
+        # band key -> most recent entry id with that band
+        self._buckets: Dict[int, int] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _band_keys(signature: Signature):
+        for band in range(_BANDS):
+            yield hash((band,) + signature[band * _ROWS:(band + 1) * _ROWS])
+
+    def _evict(self, now: float):
+        cutoff = now - self._window_seconds
+        while self._entries:
+            entry_id, (packed, added_at) = next(iter(self._entries.items()))
+            if added_at >= cutoff and len(self._entries) <= self._max_entries:
+                break
+            del self._entries[entry_id]
+            for key in self._band_keys(tuple(array('I', packed))):
+                if self._buckets.get(key) == entry_id:
+                    del self._buckets[key]
+
+    def _find(self, signature: Signature) -> bool:
+        checked = set()
+        for key in self._band_keys(signature):
+            entry_id = self._buckets.get(key)
+            if entry_id is None or entry_id in checked:
+                continue
+            checked.add(entry_id)
+            if similarity(signature, array('I', self._entries[entry_id][0])) >= self._min_similarity:
+                return True
+        return False
+
+    def _add(self, signature: Signature, now: float):
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = (array('I', signature).tobytes(), now)
+        for key in self._band_keys(signature):
+            self._buckets[key] = entry_id
+
+    def contains(self, signature: Signature) -> bool:
+        """Check for a recent near duplicate without recording the signature"""
+        with self._lock:
+            self._evict(time.monotonic())
+            return self._find(signature)
+
+    def add(self, signature: Signature):
+        """Record a signature"""
+        now = time.monotonic()
+        with self._lock:
+            self._add(signature, now)
+            self._evict(now)
+
+    def check_and_add(self, signature: Signature) -> bool:
+        """Return True if a recent near duplicate exists, otherwise record the signature"""
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            if self._find(signature):
+                return True
+            self._add(signature, now)
+            self._evict(now)
+            return False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+_index: Optional[FingerprintIndex] = None
+
+def get_fingerprint_index() -> FingerprintIndex:
+    """Get the shared index of recently published text posts"""
+    global _index
+    if _index is None:
+        _index = FingerprintIndex(
+            FINGERPRINT_WINDOW_HOURS * 3600,
+            FINGERPRINT_MAX_ENTRIES,
+            FINGERPRINT_MIN_SIMILARITY
+        )
+    return _index
+
+def is_near_duplicate_post(signature: Optional[Signature]) -> bool:
+    """Check a text post's signature against recent posts without remembering it"""
+    if signature is None:
+        return False
+    if get_fingerprint_index().contains(signature):
+        logger.info("Near-duplicate text post detected")
+        return True
+    return False
+
+def remember_post(signature: Optional[Signature]):
+    """Remember the signature of a post once it is stored for publishing"""
+    if signature is not None:
+        get_fingerprint_index().add(signature)
@@ -2,24 +2,38 @@
 Main message handlers for the bot
 """
 
+import asyncio
+import json
 import logging
+import math
 from datetime import datetime, timedelta
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from typing import List
+from telegram import Update, Message
 from telegram.ext import ContextTypes
 from telegram.error import TelegramError
 
-from bot.database import (
-    get_or_create_user, set_user_display_name, update_last_message_time,
-    can_user_send_message, is_channel_active, add_pending_media, log_message,
-    get_setting, is_admin, get_all_admins
+from bot.async_database import (
+    get_or_create_user, set_user_display_name, add_pending_media, log_message,
+    get_setting, is_admin, get_all_admins, enqueue_channel_post, decide_pending_media,
+    record_approval_prompts, find_media_decision, get_pending_media, run_in_db_thread
 )
 from bot.filters import contains_profanity
+from bot.fingerprints import is_near_duplicate_post, remember_post, text_signature
+from bot.admission import admit_message, ERROR, INACTIVE, RATE_LIMITED
+from bot.albums import get_album_collector
+from bot.keyboards import get_main_menu, get_admin_menu, get_media_approval_keyboard
+from bot.menu_handlers import BUTTON_ROUTES, handle_keyboard_input, handle_user_state_input
+from bot.outbound import Delivery, edit_reply, fan_out, get_outbound_scheduler, reply
+from bot.publisher import ALBUM_MEDIA_TYPES, get_outbox_publisher, send_channel_link
 from bot.utils import (
-    get_rate_limit_minutes, get_activity_hours, requires_approval,
+    get_rate_limit_minutes, requires_approval,
     format_time_remaining, is_valid_display_name, sanitize_text,
     get_file_type_name
 )
-from bot.config import MESSAGES, CHANNEL_ID, CHANNEL_USERNAME, CHANNEL_FOOTER
+from bot.config import (
+    MESSAGES, CHANNEL_ID, CHANNEL_USERNAME, CHANNEL_FOOTER, DUPLICATE_MEDIA_WINDOW_DAYS,
+    APPROVAL_RENOTIFY_SECONDS, APPROVAL_RENOTIFY_ROUNDS
+)
 
 logger = logging.getLogger(__name__)
 
@@ -28,115 +42,126 @@ async def start_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not update.effective_user or not update.message:
         return
         
-    user = get_or_create_user(update.effective_user.id)
+    user = await get_or_create_user(update.effective_user.id)
     if not user:
-        await update.message.reply_text("❌ خطا در دسترسی به پایگاه داده.")
+        await reply(update, "❌ خطا در دسترسی به پایگاه داده.")
         return
     
-    from bot.keyboards import get_main_menu, get_admin_menu
-    
     # Show appropriate menu based on admin status
-    if is_admin(update.effective_user.id):
+    if await is_admin(update.effective_user.id):
         keyboard = get_admin_menu()
         welcome_msg = "🤖 خوش آمدید! شما به عنوان مدیر وارد شده‌اید.\n\n" + MESSAGES['welcome']
     else:
         keyboard = get_main_menu()
         welcome_msg = MESSAGES['welcome']
     
-    await update.message.reply_text(welcome_msg, reply_markup=keyboard)
+    await reply(update, welcome_msg, reply_markup=keyboard)
 
 async def help_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /help command"""
     if not update.message:
         return
         
-    rate_limit = get_rate_limit_minutes()
+    rate_limit = await run_in_db_thread(get_rate_limit_minutes)
     help_msg = MESSAGES['help'].format(rate_limit)
-    await update.message.reply_text(help_msg)
+    await reply(update, help_msg)
 
 async def set_display_name_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /setname command"""
     if not update.effective_user or not update.message:
         return
         
-    user = get_or_create_user(update.effective_user.id)
+    user = await get_or_create_user(update.effective_user.id)
     if not user:
-        await update.message.reply_text("❌ خطا در دسترسی به پایگاه داده.")
+        await reply(update, "❌ خطا در دسترسی به پایگاه داده.")
         return
     
     # Check if user already set name
     if user.get('display_name_set'):
-        await update.message.reply_text(MESSAGES['name_already_set'])
+        await reply(update, MESSAGES['name_already_set'])
         return
     
     # Check if name is provided
     if not context.args:
-        await update.message.reply_text("❌ لطفاً نام نمایشی خود را وارد کنید.\nمثال: /setname نام_من")
+        await reply(update, "❌ لطفاً نام نمایشی خود را وارد کنید.\nمثال: /setname نام_من")
         return
     
     new_name = ' '.join(context.args).strip()
     
     # Validate name
     if not is_valid_display_name(new_name):
-        await update.message.reply_text(MESSAGES['name_invalid'])
+        await reply(update, MESSAGES['name_invalid'])
         return
     
     # Try to set name
-    if set_user_display_name(update.effective_user.id, new_name):
-        await update.message.reply_text(MESSAGES['name_set'].format(new_name))
+    if await set_user_display_name(update.effective_user.id, new_name):
+        await reply(update, MESSAGES['name_set'].format(new_name))
     else:
-        await update.message.reply_text(MESSAGES['name_taken'])
+        await reply(update, MESSAGES['name_taken'])
 
 async def message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle text and media messages"""
     if not update.effective_user or not update.message:
         return
         
-    # Check if this is a keyboard button press
-    from bot.menu_handlers import handle_keyboard_input, handle_user_state_input
-    
     if update.message.text:
         # First check if user is in a specific state (waiting for input)
         if await handle_user_state_input(update, context):
             return
         
         # Then check if it's a keyboard button
-        if update.message.text in ["📝 ارسال پیام", "📷 ارسال رسانه", "✏️ تنظیم نام نمایشی", 
-                                 "❓ راهنما", "🔗 لینک کانال", "🔄 شروع مجدد",
-                                 "👥 مدیریت ادمین‌ها", "🚫 مدیریت کلمات نامناسب", "⚙️ تنظیمات سیستم",
-                                 "📊 آمار و گزارش", "📋 تأیید رسانه‌ها", "🔙 بازگشت به منوی کاربر",
-                                 "➕ افزودن ادمین", "➖ حذف ادمین", "📋 لیست ادمین‌ها",
-                                 "➕ افزودن کلمه", "➖ حذف کلمه", "📋 لیست کلمات",
-                                 "⏰ تنظیم محدودیت زمانی", "🕐 تنظیم ساعات فعالیت",
-                                 "📋 تغییر وضعیت تأیید", "📊 مشاهده تنظیمات", "🔙 بازگشت"]:
+        if update.message.text in BUTTON_ROUTES:
             await handle_keyboard_input(update, context)
             return
     
-    user = get_or_create_user(update.effective_user.id)
-    if not user:
-        await update.message.reply_text("❌ خطا در دسترسی به پایگاه داده.")
+    # Later items of an album join the group opened by its first item. The
+    # first item's update handles the whole album once it is complete, so it
+    # stays in the user's turn and their later messages wait for it; admission
+    # applies to the album as a whole
+    if update.message.media_group_id:
+        album_key = (update.effective_user.id, update.message.media_group_id)
+        collector = get_album_collector()
+        if collector.collect(album_key, update.message):
+            return
+        collector.open(album_key, update.message)
+        try:
+            await admit_and_handle_message(update, context, album_key)
+        finally:
+            # A refused album swallows its remaining items without answering each
+            await collector.close_when_quiet(album_key)
         return
     
-    # Check rate limiting
-    if not can_user_send_message(update.effective_user.id):
-        rate_limit = get_rate_limit_minutes()
-        await update.message.reply_text(MESSAGES['rate_limited'].format(rate_limit))
+    await admit_and_handle_message(update, context)
+
+async def admit_and_handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE, album_key=None):
+    """Admit a message (or the first item of an album) and handle it"""
+    # Get the user, check activity hours and consume the rate limit in one step
+    verdict = await run_in_db_thread(admit_message, update.effective_user.id)
+    
+    if verdict.status == ERROR:
+        await reply(update, "❌ خطا در دسترسی به پایگاه داده.")
         return
     
-    # Check channel activity hours
-    if not is_channel_active():
-        start_hour, end_hour = get_activity_hours()
-        await update.message.reply_text(MESSAGES['channel_inactive'].format(start_hour, end_hour))
+    if verdict.status == INACTIVE:
+        start_hour, end_hour = verdict.activity_window
+        await reply(update, MESSAGES['channel_inactive'].format(start_hour, end_hour))
         return
     
-    # Update last message time
-    update_last_message_time(update.effective_user.id)
+    if verdict.status == RATE_LIMITED:
+        minutes = math.ceil(verdict.retry_after_seconds / 60)
+        await reply(update, MESSAGES['rate_limited'].format(minutes))
+        return
+    
+    user = verdict.user
     
     # Handle text messages
     if update.message.text:
         await handle_text_message(update, context, user)
     
     # Handle media messages
+    elif album_key:
+        messages = await get_album_collector().close_when_quiet(album_key)
+        await handle_album(update, context, user, messages)
     elif (update.message.photo or update.message.video or update.message.audio or 
           update.message.voice or update.message.document):
         await handle_media_message(update, context, user)
@@ -146,162 +171,182 @@ async def handle_text_message(update: Update, context: ContextTypes.DEFAULT_TYPE
     text = update.message.text
     
     # Check for profanity
-    if contains_profanity(text):
-        await update.message.reply_text(MESSAGES['message_filtered'])
-        log_message(user['telegram_id'], 'text', 'filtered', 'profanity')
+    if await run_in_db_thread(contains_profanity, text):
+        await reply(update, MESSAGES['message_filtered'])
+        await log_message(user['telegram_id'], 'text', 'filtered', 'profanity')
+        return
+    
+    # Reject variations of a recently published post
+    signature = text_signature(text)
+    if is_near_duplicate_post(signature):
+        await reply(update, MESSAGES['message_duplicate'])
+        await log_message(user['telegram_id'], 'text', 'filtered', 'duplicate')
         return
     
     # Prepare message for channel
     display_name = user['display_name']
     channel_message = f"📝 {sanitize_text(text)}\n\n👤 {display_name}{CHANNEL_FOOTER}"
     
+    # Store the post in the outbox; the publisher sends it to the channel
+    if CHANNEL_ID:
+        if not await enqueue_channel_post(user['telegram_id'], 'text', channel_message):
+            await reply(update, "❌ خطا در ارسال پیام به کانال.")
+            await log_message(user['telegram_id'], 'text', 'error', 'database error')
+            return
+        get_outbox_publisher().wake()
+    else:
+        await log_message(user['telegram_id'], 'text', 'sent')
+    # Only a post that was stored counts; a failed one may be sent again
+    remember_post(signature)
+    
     try:
-        # Send to channel
-        if CHANNEL_ID:
-            await context.bot.send_message(
-                chat_id=CHANNEL_ID,
-                text=channel_message,
-                parse_mode='HTML'
-            )
-        
         # Notify user
-        await update.message.reply_text(MESSAGES['message_sent'].format(CHANNEL_USERNAME))
-        log_message(user['telegram_id'], 'text', 'sent')
+        await reply(update, MESSAGES['message_sent'].format(CHANNEL_USERNAME))
         
         # Open channel for user
-        if CHANNEL_USERNAME:
-            keyboard = [[InlineKeyboardButton("🔗 مشاهده در کانال", url=f"https://t.me/{CHANNEL_USERNAME}")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            await update.message.reply_text("🔗 کانال:", reply_markup=reply_markup)
+        await send_channel_link(context.bot, update.effective_chat.id)
         
     except TelegramError as e:
-        logger.error(f"Error sending message to channel: {e}")
-        await update.message.reply_text("❌ خطا در ارسال پیام به کانال.")
-        log_message(user['telegram_id'], 'text', 'error', str(e))
+        logger.error(f"Error notifying user about sent message: {e}")
+
+def get_message_file(message: Message):
+    """Get (file object, file type) of a media message, or (None, None)"""
+    if message.photo:
+        return message.photo[-1], 'photo'  # Get highest resolution
+    elif message.video:
+        return message.video, 'video'
+    elif message.audio:
+        return message.audio, 'audio'
+    elif message.voice:
+        return message.voice, 'voice'
+    elif message.document:
+        return message.document, 'document'
+    return None, None
 
 async def handle_media_message(update: Update, context: ContextTypes.DEFAULT_TYPE, user: dict):
     """Handle media messages"""
-    # Determine file type and get file info
-    file_info = None
-    file_type = None
+    file_info, file_type = get_message_file(update.message)
     caption = update.message.caption or ""
     
-    if update.message.photo:
-        file_info = update.message.photo[-1]  # Get highest resolution
-        file_type = 'photo'
-    elif update.message.video:
-        file_info = update.message.video
-        file_type = 'video'
-    elif update.message.audio:
-        file_info = update.message.audio
-        file_type = 'audio'
-    elif update.message.voice:
-        file_info = update.message.voice
-        file_type = 'voice'
-    elif update.message.document:
-        file_info = update.message.document
-        file_type = 'document'
-    
     if not file_info:
-        await update.message.reply_text("❌ نوع فایل پشتیبانی نمی‌شود.")
+        await reply(update, "❌ نوع فایل پشتیبانی نمی‌شود.")
+        return
+    
+    await submit_media(update, context, user, file_type, file_info.file_id, caption,
+                       file_unique_id=file_info.file_unique_id)
+
+async def handle_album(update: Update, context: ContextTypes.DEFAULT_TYPE, user: dict, messages: List[Message]):
+    """Handle a complete album as one submission"""
+    items = []
+    unique_ids = []
+    caption = ""
+    for message in messages:
+        file_info, file_type = get_message_file(message)
+        # Telegram cannot send other types, such as voice messages, in an album
+        if file_info and file_type in ALBUM_MEDIA_TYPES:
+            items.append({'type': file_type, 'file_id': file_info.file_id})
+            unique_ids.append(file_info.file_unique_id)
+        # Telegram shows the caption of whichever item has one
+        caption = caption or message.caption or ""
+    
+    if not items:
+        await reply(update, "❌ نوع فایل پشتیبانی نمی‌شود.")
         return
     
+    # The same files in the same order count as the same album
+    album_unique_id = 'album:' + ','.join(unique_ids)
+    await submit_media(update, context, user, 'album', items[0]['file_id'], caption, json.dumps(items),
+                       album_unique_id)
+
+async def submit_media(update: Update, context: ContextTypes.DEFAULT_TYPE, user: dict,
+                       file_type: str, file_id: str, caption: str, items: str = None,
+                       file_unique_id: str = None):
+    """Publish media directly or queue it for approval"""
     # Check if approval is required
-    if not requires_approval():
+    if not await run_in_db_thread(requires_approval):
         # Send directly to channel
-        await send_media_to_channel(update, context, user, file_info, file_type, caption)
+        await send_media_to_channel(update, context, user, file_id, file_type, caption, items)
+        return
+    
+    # A file moderators have already seen is answered without another review,
+    # unless it comes with a caption they have not approved
+    decision = await find_media_decision(file_unique_id, DUPLICATE_MEDIA_WINDOW_DAYS, caption) if file_unique_id else None
+    if decision == 'pending':
+        await reply(update, MESSAGES['media_already_pending'])
+        await log_message(user['telegram_id'], file_type, 'filtered', 'duplicate pending')
+        return
+    if decision == 'rejected':
+        reason = "این رسانه قبلاً رد شده است"
+        await reply(update, MESSAGES['media_rejected'].format(reason))
+        await log_message(user['telegram_id'], file_type, 'rejected', 'duplicate')
+        return
+    if decision == 'approved':
+        await log_message(user['telegram_id'], file_type, 'approved', 'duplicate')
+        await send_media_to_channel(update, context, user, file_id, file_type, caption, items)
         return
     
     # Add to pending media for approval
-    media_id = add_pending_media(
+    media_id = await add_pending_media(
         user['telegram_id'],
         update.message.message_id,
-        file_info.file_id,
+        file_id,
         file_type,
-        caption
+        caption,
+        items,
+        file_unique_id
     )
     
     if media_id:
-        await update.message.reply_text(MESSAGES['media_sent_for_review'])
-        log_message(user['telegram_id'], file_type, 'pending')
+        await reply(update, MESSAGES['media_sent_for_review'])
+        await log_message(user['telegram_id'], file_type, 'pending')
         
         # Notify admins
         await notify_admins_for_approval(context, media_id, user, file_type, caption)
     else:
-        await update.message.reply_text("❌ خطا در ارسال رسانه برای بررسی.")
-        log_message(user['telegram_id'], file_type, 'error', 'database error')
+        await reply(update, "❌ خطا در ارسال رسانه برای بررسی.")
+        await log_message(user['telegram_id'], file_type, 'error', 'database error')
 
 async def send_media_to_channel(update: Update, context: ContextTypes.DEFAULT_TYPE, 
-                               user: dict, file_info, file_type: str, caption: str = ""):
+                               user: dict, file_id: str, file_type: str, caption: str = "",
+                               items: str = None):
     """Send media directly to channel"""
     display_name = user['display_name']
     
     # Prepare caption
-    if caption and contains_profanity(caption):
+    if caption and await run_in_db_thread(contains_profanity, caption):
         caption = ""  # Remove profane caption
     
     channel_caption = f"{sanitize_text(caption)}\n\n👤 {display_name}{CHANNEL_FOOTER}" if caption else f"👤 {display_name}{CHANNEL_FOOTER}"
     
+    # Store the post in the outbox; the publisher sends it to the channel
+    if not await enqueue_channel_post(user['telegram_id'], file_type, channel_caption, file_id, items=items):
+        await reply(update, "❌ خطا در ارسال رسانه به کانال.")
+        await log_message(user['telegram_id'], file_type, 'error', 'database error')
+        return
+    get_outbox_publisher().wake()
+    
     try:
-        # Send to channel based on file type
-        if file_type == 'photo':
-            await context.bot.send_photo(
-                chat_id=CHANNEL_ID,
-                photo=file_info.file_id,
-                caption=channel_caption,
-                parse_mode='HTML'
-            )
-        elif file_type == 'video':
-            await context.bot.send_video(
-                chat_id=CHANNEL_ID,
-                video=file_info.file_id,
-                caption=channel_caption,
-                parse_mode='HTML'
-            )
-        elif file_type == 'audio':
-            await context.bot.send_audio(
-                chat_id=CHANNEL_ID,
-                audio=file_info.file_id,
-                caption=channel_caption,
-                parse_mode='HTML'
-            )
-        elif file_type == 'voice':
-            await context.bot.send_voice(
-                chat_id=CHANNEL_ID,
-                voice=file_info.file_id,
-                caption=channel_caption,
-                parse_mode='HTML'
-            )
-        elif file_type == 'document':
-            await context.bot.send_document(
-                chat_id=CHANNEL_ID,
-                document=file_info.file_id,
-                caption=channel_caption,
-                parse_mode='HTML'
-            )
-        
         # Notify user
-        await update.message.reply_text(MESSAGES['message_sent'].format(CHANNEL_USERNAME))
-        log_message(user['telegram_id'], file_type, 'sent')
+        await reply(update, MESSAGES['message_sent'].format(CHANNEL_USERNAME))
         
         # Open channel for user
-        if CHANNEL_USERNAME:
-            keyboard = [[InlineKeyboardButton("🔗 مشاهده در کانال", url=f"https://t.me/{CHANNEL_USERNAME}")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            await update.message.reply_text("🔗 کانال:", reply_markup=reply_markup)
+        await send_channel_link(context.bot, update.effective_chat.id)
             
     except TelegramError as e:
-        logger.error(f"Error sending media to channel: {e}")
-        await update.message.reply_text("❌ خطا در ارسال رسانه به کانال.")
-        log_message(user['telegram_id'], file_type, 'error', str(e))
+        logger.error(f"Error notifying user about sent media: {e}")
 
 async def notify_admins_for_approval(context: ContextTypes.DEFAULT_TYPE, media_id: int, 
-                                   user: dict, file_type: str, caption: str):
-    """Notify admins about pending media"""
-    admins = get_all_admins()
+                                   user: dict, file_type: str, caption: str,
+                                   renotify_round: int = 0) -> List[Delivery]:
+    """Notify admins about pending media; returns one Delivery per admin
+
+    If no admin received the prompt, it is sent again later in the
+    background while the media is still pending.
+    """
+    admins = await get_all_admins()
     if not admins:
         logger.warning("No admins found to notify")
-        return
+        return []
     
     file_type_name = get_file_type_name(file_type)
     message = f"📋 درخواست تأیید {file_type_name}\n\n"
@@ -311,33 +356,80 @@ async def notify_admins_for_approval(context: ContextTypes.DEFAULT_TYPE, media_i
     message += f"\n⏰ زمان: {datetime.now().strftime('%Y-%m-%d %H:%M')}"
     
     # Create approval buttons
-    keyboard = [
-        [
-            InlineKeyboardButton("✅ تأیید", callback_data=f"approve_{media_id}"),
-            InlineKeyboardButton("❌ رد", callback_data=f"reject_{media_id}")
-        ]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    # Send to all admins
-    for admin_id in admins:
-        try:
-            await context.bot.send_message(
-                chat_id=admin_id,
-                text=message,
-                reply_markup=reply_markup
+    reply_markup = get_media_approval_keyboard(media_id)
+    
+    # Send to all admins concurrently; a slow or blocked admin does not hold up the rest
+    async def notify(admin_id: int):
+        return await context.bot.send_message(chat_id=admin_id, text=message, reply_markup=reply_markup)
+    
+    deliveries = await fan_out(admins, notify)
+    for delivery in deliveries:
+        if delivery.ok:
+            logger.debug(f"Notified admin {delivery.chat_id} in {delivery.latency * 1000:.0f} ms")
+        else:
+            logger.error(f"Error notifying admin {delivery.chat_id} after {delivery.attempts} attempts: {delivery.error}")
+    
+    delivered = sum(1 for delivery in deliveries if delivery.ok)
+    slowest = max(delivery.latency for delivery in deliveries)
+    logger.info(f"Notified {delivered}/{len(deliveries)} admins about media {media_id} (slowest {slowest * 1000:.0f} ms)")
+    
+    # Remember the prompts so they can be retracted once an admin decides;
+    # if that already happened while they were being sent, retract them now
+    prompts = [(delivery.chat_id, delivery.result.message_id) for delivery in deliveries if delivery.ok]
+    recorded = True
+    if prompts and not await record_approval_prompts(media_id, prompts):
+        media = await get_pending_media(media_id)
+        if media is not None and media['state'] == 'pending':
+            # The prompts could not be stored, so a decision could never retract
+            # them; take them back now and send fresh ones later
+            recorded = False
+            await retract_approval_prompts(context, prompts, "⚠️ این درخواست منقضی شد و دوباره ارسال می‌شود.")
+        else:
+            await retract_approval_prompts(context, prompts, "⚠️ این رسانه قبلاً بررسی شده است.")
+    
+    if not delivered or not recorded:
+        if renotify_round < APPROVAL_RENOTIFY_ROUNDS:
+            context.application.create_task(
+                renotify_admins_for_approval(context, media_id, user, file_type, caption, renotify_round + 1)
             )
-        except TelegramError as e:
-            logger.error(f"Error notifying admin {admin_id}: {e}")
+        else:
+            logger.error(f"No admin holds a live approval prompt for media {media_id}; giving up")
+    return deliveries
+
+async def renotify_admins_for_approval(context: ContextTypes.DEFAULT_TYPE, media_id: int,
+                                      user: dict, file_type: str, caption: str, renotify_round: int):
+    """Send an approval prompt again after a delay if the media is still pending"""
+    delay = APPROVAL_RENOTIFY_SECONDS * 2 ** (renotify_round - 1)
+    logger.warning(f"No admin holds a live approval prompt for media {media_id}; resending in {delay}s")
+    await asyncio.sleep(delay)
+    media = await get_pending_media(media_id)
+    if media is None or media['state'] != 'pending':
+        return
+    await notify_admins_for_approval(context, media_id, user, file_type, caption, renotify_round)
+
+async def retract_approval_prompts(context: ContextTypes.DEFAULT_TYPE, prompts, text: str):
+    """Replace approval prompts with the outcome and remove their buttons
+
+    The edits go out concurrently through the outbound scheduler, so they
+    are paced per admin chat and globally.
+    """
+    message_ids = dict(prompts)
+    
+    async def retract(chat_id: int):
+        return await context.bot.edit_message_text(text, chat_id=chat_id, message_id=message_ids[chat_id])
+    
+    for delivery in await fan_out(message_ids, retract):
+        if not delivery.ok:
+            logger.warning(f"Error retracting approval prompt for admin {delivery.chat_id}: {delivery.error}")
 
 async def button_callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle inline button callbacks"""
     query = update.callback_query
-    await query.answer()
     
     # Check if user is admin
-    if not is_admin(query.from_user.id):
-        await query.edit_message_text("❌ شما مجوز دسترسی به این بخش را ندارید.")
+    if not await is_admin(query.from_user.id):
+        await query.answer()
+        await edit_reply(query, "❌ شما مجوز دسترسی به این بخش را ندارید.")
         return
     
     data = query.data
@@ -348,127 +440,85 @@ async def button_callback_handler(update: Update, context: ContextTypes.DEFAULT_
     elif data.startswith("reject_"):
         media_id = int(data.split("_")[1])
         await reject_media_callback(query, context, media_id)
+    else:
+        await query.answer()
 
-async def approve_media_callback(query, context: ContextTypes.DEFAULT_TYPE, media_id: int):
-    """Handle media approval"""
-    from bot.database import get_pending_media, remove_pending_media
+def build_approved_channel_caption(media: dict) -> str:
+    """Build the channel caption for approved media (runs inside the decision transaction)"""
+    display_name = media['display_name']
+    caption = media['caption'] if media['caption'] else ""
     
-    # Get pending media
-    media = get_pending_media(media_id)
+    # Check caption for profanity
+    if caption and contains_profanity(caption):
+        caption = ""
+    
+    return f"{sanitize_text(caption)}\n\n👤 {display_name}{CHANNEL_FOOTER}" if caption else f"👤 {display_name}{CHANNEL_FOOTER}"
+
+async def answer_already_decided(query, media: dict) -> None:
+    """Answer a moderation button whose item is gone or was decided by someone else"""
     if not media:
-        await query.edit_message_text("❌ رسانه یافت نشد.")
+        await query.answer("❌ رسانه یافت نشد.")
+    elif media['state'] == 'approved':
+        await query.answer("⚠️ این رسانه قبلاً تأیید شده است.")
+    else:
+        await query.answer("⚠️ این رسانه قبلاً رد شده است.")
+
+def retract_sibling_prompts(query, context: ContextTypes.DEFAULT_TYPE, media: dict, text: str):
+    """Retract every prompt for decided media except the one the deciding admin pressed"""
+    own_chat_id = query.message.chat_id if query.message else None
+    siblings = [(chat_id, message_id) for chat_id, message_id in media['prompts'] if chat_id != own_chat_id]
+    if siblings:
+        context.application.create_task(retract_approval_prompts(context, siblings, text))
+
+async def approve_media_callback(query, context: ContextTypes.DEFAULT_TYPE, media_id: int):
+    """Handle media approval"""
+    # Claim the decision and queue the channel post in one transaction; only
+    # the first admin to press a button gets past this point
+    claimed, media = await decide_pending_media(
+        media_id, query.from_user.id, 'approved', build_approved_channel_caption
+    )
+    if not claimed:
+        await answer_already_decided(query, media)
         return
     
-    # Get user info
-    user = get_or_create_user(media['user_telegram_id'])
-    if not user:
-        await query.edit_message_text("❌ خطا در دسترسی به اطلاعات کاربر.")
-        return
+    # The publisher sends the post to the channel and notifies the user once it is published
+    get_outbox_publisher().wake()
+    await query.answer("✅ رسانه تأیید شد.")
+    await log_message(media['user_telegram_id'], media['file_type'], 'approved')
     
-    try:
-        # Send media to channel
-        display_name = user['display_name']
-        caption = media['caption'] if media['caption'] else ""
-        
-        # Check caption for profanity
-        if caption and contains_profanity(caption):
-            caption = ""
-        
-        channel_caption = f"{sanitize_text(caption)}\n\n👤 {display_name}{CHANNEL_FOOTER}" if caption else f"👤 {display_name}{CHANNEL_FOOTER}"
-        
-        # Send based on file type
-        if media['file_type'] == 'photo':
-            await context.bot.send_photo(
-                chat_id=CHANNEL_ID,
-                photo=media['file_id'],
-                caption=channel_caption,
-                parse_mode='HTML'
-            )
-        elif media['file_type'] == 'video':
-            await context.bot.send_video(
-                chat_id=CHANNEL_ID,
-                video=media['file_id'],
-                caption=channel_caption,
-                parse_mode='HTML'
-            )
-        elif media['file_type'] == 'audio':
-            await context.bot.send_audio(
-                chat_id=CHANNEL_ID,
-                audio=media['file_id'],
-                caption=channel_caption,
-                parse_mode='HTML'
-            )
-        elif media['file_type'] == 'voice':
-            await context.bot.send_voice(
-                chat_id=CHANNEL_ID,
-                voice=media['file_id'],
-                caption=channel_caption,
-                parse_mode='HTML'
-            )
-        elif media['file_type'] == 'document':
-            await context.bot.send_document(
-                chat_id=CHANNEL_ID,
-                document=media['file_id'],
-                caption=channel_caption,
-                parse_mode='HTML'
-            )
-        
-        # Notify user
-        try:
-            await context.bot.send_message(
-                chat_id=media['user_telegram_id'],
-                text=MESSAGES['media_approved'].format(CHANNEL_USERNAME)
-            )
-            
-            # Send channel link
-            if CHANNEL_USERNAME:
-                keyboard = [[InlineKeyboardButton("🔗 مشاهده در کانال", url=f"https://t.me/{CHANNEL_USERNAME}")]]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                await context.bot.send_message(
-                    chat_id=media['user_telegram_id'],
-                    text="🔗 کانال:",
-                    reply_markup=reply_markup
-                )
-        except TelegramError as e:
-            logger.error(f"Error notifying user about approval: {e}")
-        
-        # Remove from pending
-        remove_pending_media(media_id)
-        log_message(media['user_telegram_id'], media['file_type'], 'approved')
-        
-        # Update admin message
-        await query.edit_message_text(f"✅ رسانه تأیید و در کانال منتشر شد.\n⏰ {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-        
-    except TelegramError as e:
-        logger.error(f"Error approving media: {e}")
-        await query.edit_message_text(f"❌ خطا در ارسال رسانه به کانال: {str(e)}")
+    # Update the other admins' prompts in the background
+    retract_sibling_prompts(query, context, media, "✅ این رسانه توسط مدیر دیگری تأیید شد.")
+    
+    # Update admin message
+    await edit_reply(query, f"✅ رسانه تأیید شد و در صف انتشار در کانال قرار گرفت.\n⏰ {datetime.now().strftime('%Y-%m-%d %H:%M')}")
 
 async def reject_media_callback(query, context: ContextTypes.DEFAULT_TYPE, media_id: int):
-    """Handle media rejection - ask for reason"""
+    """Handle media rejection"""
     # For simplicity, we'll use a default reason
     # In a more advanced implementation, you could ask for custom reason
     reason = "محتوای نامناسب"
     
-    from bot.database import get_pending_media, remove_pending_media
-    
-    # Get pending media
-    media = get_pending_media(media_id)
-    if not media:
-        await query.edit_message_text("❌ رسانه یافت نشد.")
+    claimed, media = await decide_pending_media(media_id, query.from_user.id, 'rejected')
+    if not claimed:
+        await answer_already_decided(query, media)
         return
     
+    await query.answer("❌ رسانه رد شد.")
+    await log_message(media['user_telegram_id'], media['file_type'], 'rejected', reason)
+    
+    # Update the other admins' prompts in the background
+    retract_sibling_prompts(query, context, media, "❌ این رسانه توسط مدیر دیگری رد شد.")
+    
     # Notify user
     try:
-        await context.bot.send_message(
+        await get_outbound_scheduler().send(
+            media['user_telegram_id'],
+            context.bot.send_message,
             chat_id=media['user_telegram_id'],
             text=MESSAGES['media_rejected'].format(reason)
         )
     except TelegramError as e:
         logger.error(f"Error notifying user about rejection: {e}")
     
-    # Remove from pending
-    remove_pending_media(media_id)
-    log_message(media['user_telegram_id'], media['file_type'], 'rejected', reason)
-    
     # Update admin message
-    await query.edit_message_text(f"❌ رسانه رد شد.\n📝 دلیل: {reason}\n⏰ {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+    await edit_reply(query, f"❌ رسانه رد شد.\n📝 دلیل: {reason}\n⏰ {datetime.now().strftime('%Y-%m-%d %H:%M')}")
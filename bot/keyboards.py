@@ -2,74 +2,177 @@
 Keyboard layouts for the bot
 """
 
-from telegram import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton
+from functools import lru_cache
+
+from telegram import (
+    InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, ReplyKeyboardRemove, KeyboardButton
+)
+
+# Reply keyboard button labels
+BTN_SEND_MESSAGE = "📝 ارسال پیام"
+BTN_SEND_MEDIA = "📷 ارسال رسانه"
+BTN_SET_DISPLAY_NAME = "✏️ تنظیم نام نمایشی"
+BTN_HELP = "❓ راهنما"
+BTN_CHANNEL_LINK = "🔗 لینک کانال"
+BTN_RESTART = "🔄 شروع مجدد"
+BTN_ADMIN_MANAGEMENT = "👥 مدیریت ادمین‌ها"
+BTN_PROFANITY_MANAGEMENT = "🚫 مدیریت کلمات نامناسب"
+BTN_SETTINGS = "⚙️ تنظیمات سیستم"
+BTN_STATS = "📊 آمار و گزارش"
+BTN_MEDIA_APPROVAL = "📋 تأیید رسانه‌ها"
+BTN_BACK_TO_USER_MENU = "🔙 بازگشت به منوی کاربر"
+BTN_ADD_ADMIN = "➕ افزودن ادمین"
+BTN_REMOVE_ADMIN = "➖ حذف ادمین"
+BTN_LIST_ADMINS = "📋 لیست ادمین‌ها"
+BTN_ADD_PROFANITY = "➕ افزودن کلمه"
+BTN_REMOVE_PROFANITY = "➖ حذف کلمه"
+BTN_LIST_PROFANITY = "📋 لیست کلمات"
+BTN_SET_RATE_LIMIT = "⏰ تنظیم محدودیت زمانی"
+BTN_SET_ACTIVITY_HOURS = "🕐 تنظیم ساعات فعالیت"
+BTN_TOGGLE_APPROVAL = "📋 تغییر وضعیت تأیید"
+BTN_VIEW_SETTINGS = "📊 مشاهده تنظیمات"
+BTN_BACK = "🔙 بازگشت"
+
+# Reply keyboard layouts as rows of button labels
+MAIN_MENU_LAYOUT = (
+    (BTN_SEND_MESSAGE, BTN_SEND_MEDIA),
+    (BTN_SET_DISPLAY_NAME, BTN_HELP),
+    (BTN_CHANNEL_LINK, BTN_RESTART),
+)
+ADMIN_MENU_LAYOUT = (
+    (BTN_ADMIN_MANAGEMENT, BTN_PROFANITY_MANAGEMENT),
+    (BTN_SETTINGS, BTN_STATS),
+    (BTN_MEDIA_APPROVAL, BTN_BACK_TO_USER_MENU),
+)
+ADMIN_MANAGEMENT_MENU_LAYOUT = (
+    (BTN_ADD_ADMIN, BTN_REMOVE_ADMIN),
+    (BTN_LIST_ADMINS, BTN_BACK),
+)
+PROFANITY_MENU_LAYOUT = (
+    (BTN_ADD_PROFANITY, BTN_REMOVE_PROFANITY),
+    (BTN_LIST_PROFANITY, BTN_BACK),
+)
+SETTINGS_MENU_LAYOUT = (
+    (BTN_SET_RATE_LIMIT, BTN_SET_ACTIVITY_HOURS),
+    (BTN_TOGGLE_APPROVAL, BTN_VIEW_SETTINGS),
+    (BTN_BACK,),
+)
+BACK_BUTTON_LAYOUT = (
+    (BTN_BACK,),
+)
+
+# Every reply keyboard whose buttons are routed by menu_handlers
+MENU_LAYOUTS = (
+    MAIN_MENU_LAYOUT, ADMIN_MENU_LAYOUT, ADMIN_MANAGEMENT_MENU_LAYOUT,
+    PROFANITY_MENU_LAYOUT, SETTINGS_MENU_LAYOUT, BACK_BUTTON_LAYOUT,
+)
+
+def menu_labels():
+    """Get every reply keyboard button label, each once"""
+    return {label for layout in MENU_LAYOUTS for row in layout for label in row}
+
+def _copy_json(value):
+    """Copy the dicts and lists of a JSON-ready value; leaves are immutable"""
+    if isinstance(value, dict):
+        return {key: _copy_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_json(item) for item in value]
+    return value
+
+class _SerializedOnce:
+    """Markup mixin that serializes itself once
+
+    Markups are frozen after construction, so their to_dict() never changes
+    and is computed on first use only. Each call returns a copy of the
+    cached dict, which is far cheaper than serializing again and leaves the
+    cache intact if a caller modifies the result.
+    """
+    __slots__ = ()
+
+    def to_dict(self, recursive: bool = True):
+        if not recursive:
+            return super().to_dict(recursive=False)
+        serialized = getattr(self, '_serialized', None)
+        if serialized is None:
+            serialized = super().to_dict()
+            # Bypass the frozen check; the slot is not a Telegram attribute
+            object.__setattr__(self, '_serialized', serialized)
+        return _copy_json(serialized)
+
+class StaticReplyKeyboardMarkup(_SerializedOnce, ReplyKeyboardMarkup):
+    """ReplyKeyboardMarkup whose serialized form is cached"""
+    __slots__ = ('_serialized',)
+
+class StaticInlineKeyboardMarkup(_SerializedOnce, InlineKeyboardMarkup):
+    """InlineKeyboardMarkup whose serialized form is cached"""
+    __slots__ = ('_serialized',)
+
+def _reply_keyboard(layout):
+    keyboard = [[KeyboardButton(label) for label in row] for row in layout]
+    return StaticReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=False)
+
+# Static markups, built once and shared by every call of the factories below
+MAIN_MENU = _reply_keyboard(MAIN_MENU_LAYOUT)
+ADMIN_MENU = _reply_keyboard(ADMIN_MENU_LAYOUT)
+ADMIN_MANAGEMENT_MENU = _reply_keyboard(ADMIN_MANAGEMENT_MENU_LAYOUT)
+PROFANITY_MENU = _reply_keyboard(PROFANITY_MENU_LAYOUT)
+SETTINGS_MENU = _reply_keyboard(SETTINGS_MENU_LAYOUT)
+BACK_BUTTON = _reply_keyboard(BACK_BUTTON_LAYOUT)
+LANGUAGE_KEYBOARD = StaticInlineKeyboardMarkup([[
+    InlineKeyboardButton("🇮🇷 فارسی", callback_data="lang_fa"),
+    InlineKeyboardButton("🇺🇸 English", callback_data="lang_en")
+]])
+REMOVE_KEYBOARD = ReplyKeyboardRemove()
+
+# Media approval buttons as (label, callback data template)
+MEDIA_APPROVAL_LAYOUT = (
+    (("✅ تأیید", "approve_{}"), ("❌ رد", "reject_{}")),
+)
 
 # Main menu for regular users
 def get_main_menu():
     """Get main menu keyboard for users"""
-    keyboard = [
-        [KeyboardButton("📝 ارسال پیام"), KeyboardButton("📷 ارسال رسانه")],
-        [KeyboardButton("✏️ تنظیم نام نمایشی"), KeyboardButton("❓ راهنما")],
-        [KeyboardButton("🔗 لینک کانال"), KeyboardButton("🔄 شروع مجدد")]
-    ]
-    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=False)
+    return MAIN_MENU
 
 # Admin menu
 def get_admin_menu():
     """Get admin menu keyboard"""
-    keyboard = [
-        [KeyboardButton("👥 مدیریت ادمین‌ها"), KeyboardButton("🚫 مدیریت کلمات نامناسب")],
-        [KeyboardButton("⚙️ تنظیمات سیستم"), KeyboardButton("📊 آمار و گزارش")],
-        [KeyboardButton("📋 تأیید رسانه‌ها"), KeyboardButton("🔙 بازگشت به منوی کاربر")]
-    ]
-    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=False)
+    return ADMIN_MENU
 
 # Admin management submenu
 def get_admin_management_menu():
     """Get admin management submenu"""
-    keyboard = [
-        [KeyboardButton("➕ افزودن ادمین"), KeyboardButton("➖ حذف ادمین")],
-        [KeyboardButton("📋 لیست ادمین‌ها"), KeyboardButton("🔙 بازگشت")]
-    ]
-    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=False)
+    return ADMIN_MANAGEMENT_MENU
 
 # Profanity management submenu
 def get_profanity_menu():
     """Get profanity management submenu"""
-    keyboard = [
-        [KeyboardButton("➕ افزودن کلمه"), KeyboardButton("➖ حذف کلمه")],
-        [KeyboardButton("📋 لیست کلمات"), KeyboardButton("🔙 بازگشت")]
-    ]
-    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=False)
+    return PROFANITY_MENU
 
 # Settings submenu
 def get_settings_menu():
     """Get settings submenu"""
-    keyboard = [
-        [KeyboardButton("⏰ تنظیم محدودیت زمانی"), KeyboardButton("🕐 تنظیم ساعات فعالیت")],
-        [KeyboardButton("📋 تغییر وضعیت تأیید"), KeyboardButton("📊 مشاهده تنظیمات")],
-        [KeyboardButton("🔙 بازگشت")]
-    ]
-    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=False)
+    return SETTINGS_MENU
 
 # Inline keyboards for media approval
 def get_media_approval_keyboard(media_id: int):
-    """Get inline keyboard for media approval"""
-    keyboard = [
-        [
-            InlineKeyboardButton("✅ تأیید", callback_data=f"approve_{media_id}"),
-            InlineKeyboardButton("❌ رد", callback_data=f"reject_{media_id}")
-        ]
-    ]
-    return InlineKeyboardMarkup(keyboard)
+    """Get inline keyboard for media approval
+
+    One markup is sent to every admin, so it is serialized only once.
+    """
+    return StaticInlineKeyboardMarkup([
+        [InlineKeyboardButton(label, callback_data=data.format(media_id)) for label, data in row]
+        for row in MEDIA_APPROVAL_LAYOUT
+    ])
 
 # Inline keyboard for channel link
+@lru_cache(maxsize=None)
 def get_channel_link_keyboard(channel_username: str):
     """Get inline keyboard for channel link"""
     keyboard = [
         [InlineKeyboardButton("🔗 مشاهده کانال", url=f"https://t.me/{channel_username}")]
     ]
-    return InlineKeyboardMarkup(keyboard)
+    return StaticInlineKeyboardMarkup(keyboard)
 
 # Confirmation keyboards
 def get_confirmation_keyboard(action: str, item_id: str = ""):
@@ -85,22 +188,14 @@ def get_confirmation_keyboard(action: str, item_id: str = ""):
 # Language selection keyboard (for future use)
 def get_language_keyboard():
     """Get language selection keyboard"""
-    keyboard = [
-        [
-            InlineKeyboardButton("🇮🇷 فارسی", callback_data="lang_fa"),
-            InlineKeyboardButton("🇺🇸 English", callback_data="lang_en")
-        ]
-    ]
-    return InlineKeyboardMarkup(keyboard)
+    return LANGUAGE_KEYBOARD
 
 # Back button
 def get_back_button():
     """Get simple back button"""
-    keyboard = [[KeyboardButton("🔙 بازگشت")]]
-    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=False)
+    return BACK_BUTTON
 
 # Remove keyboard
 def remove_keyboard():
     """Remove keyboard"""
-    from telegram import ReplyKeyboardRemove
-    return ReplyKeyboardRemove()
\ No newline at end of file
+    return REMOVE_KEYBOARD
@@ -0,0 +1,88 @@
+"""
+Write-behind buffer for message log rows
+"""
+
+import atexit
+import logging
+import threading
+from typing import Callable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+LogRow = Tuple
+
+class MessageLogWriter:
+    """Queue log rows in memory and write them in batches
+
+    Rows are flushed with a single write call when ``max_rows`` are queued or
+    every ``interval_ms`` milliseconds, whichever comes first. ``close()``
+    flushes whatever is left, and is also registered with atexit so a clean
+    interpreter exit does not drop queued rows.
+    """
+
+    def __init__(self, write_rows: Callable[[Sequence[LogRow]], None],
+                 max_rows: int = 200, interval_ms: int = 500):
+        self._write_rows = write_rows
+        self._max_rows = max_rows
+        self._interval = interval_ms / 1000
+        # Rows are kept after a failed flush, up to this many
+        self._max_buffered = max_rows * 50
+        self._buffer: List[LogRow] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def enqueue(self, row: LogRow):
+        """Queue one row for the next flush"""
+        with self._lock:
+            self._buffer.append(row)
+            size = len(self._buffer)
+            if self._thread is None and not self._stopping.is_set():
+                self._start()
+        if size >= self._max_rows:
+            self._wakeup.set()
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name="message-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self._interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """Write every queued row in one batch and return how many were written"""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+            try:
+                self._write_rows(rows)
+                return len(rows)
+            except Exception as e:
+                logger.error(f"Error flushing {len(rows)} message logs: {e}")
+                with self._lock:
+                    # Keep the failed batch for the next attempt unless the buffer is overflowing
+                    if len(self._buffer) + len(rows) <= self._max_buffered:
+                        self._buffer[:0] = rows
+                return 0
+
+    def pending(self) -> int:
+        """Number of rows waiting to be written"""
+        with self._lock:
+            return len(self._buffer)
+
+    def close(self):
+        """Stop the background flusher and write the remaining rows"""
+        self._stopping.set()
+        self._wakeup.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self.flush()
@@ -0,0 +1,44 @@
+"""
+Periodic background jobs that persist in-memory state
+"""
+
+import asyncio
+import logging
+from typing import Callable, List, Tuple
+
+from bot.async_database import run_in_db_thread
+
+logger = logging.getLogger(__name__)
+
+# (name, interval in seconds, blocking function run on the database thread)
+_jobs: List[Tuple[str, float, Callable[[], None]]] = []
+_tasks: List[asyncio.Task] = []
+
+def register_periodic_job(name: str, interval: float, func: Callable[[], None]):
+    """Run func on the database thread every interval seconds and once more at shutdown"""
+    _jobs.append((name, interval, func))
+
+async def _run_job(name: str, func: Callable[[], None]):
+    try:
+        await run_in_db_thread(func)
+    except Exception as e:
+        logger.error(f"Error running periodic job {name}: {e}")
+
+async def _run_periodically(name: str, interval: float, func: Callable[[], None]):
+    while True:
+        await asyncio.sleep(interval)
+        await _run_job(name, func)
+
+def start_maintenance():
+    """Start every registered job on the running event loop"""
+    for name, interval, func in _jobs:
+        _tasks.append(asyncio.create_task(_run_periodically(name, interval, func), name=name))
+
+async def stop_maintenance():
+    """Cancel the periodic jobs and run each one a final time"""
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+    for name, _, func in _jobs:
+        await _run_job(name, func)
@@ -3,111 +3,90 @@ Menu handlers for keyboard interactions
 """
 
 import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict
+
 from telegram import Update
 from telegram.ext import ContextTypes
 
-from bot.database import (
+from bot.async_database import (
     get_or_create_user, is_admin, get_setting, set_setting,
     add_admin, remove_admin, get_all_admins,
-    add_profanity_word, remove_profanity_word, get_profanity_words
+    add_profanity_word, remove_profanity_word, get_profanity_words,
+    set_user_display_name, run_in_db_thread
 )
 from bot.keyboards import (
     get_main_menu, get_admin_menu, get_admin_management_menu,
-    get_profanity_menu, get_settings_menu, get_channel_link_keyboard
+    get_profanity_menu, get_settings_menu, get_channel_link_keyboard, menu_labels,
+    BTN_SEND_MESSAGE, BTN_SEND_MEDIA, BTN_SET_DISPLAY_NAME, BTN_HELP, BTN_CHANNEL_LINK, BTN_RESTART,
+    BTN_ADMIN_MANAGEMENT, BTN_PROFANITY_MANAGEMENT, BTN_SETTINGS, BTN_STATS, BTN_MEDIA_APPROVAL,
+    BTN_BACK_TO_USER_MENU, BTN_ADD_ADMIN, BTN_REMOVE_ADMIN, BTN_LIST_ADMINS, BTN_ADD_PROFANITY,
+    BTN_REMOVE_PROFANITY, BTN_LIST_PROFANITY, BTN_SET_RATE_LIMIT, BTN_SET_ACTIVITY_HOURS,
+    BTN_TOGGLE_APPROVAL, BTN_VIEW_SETTINGS, BTN_BACK
 )
 from bot.config import MESSAGES, CHANNEL_USERNAME
+from bot.conversation_state import get_conversation_states
+from bot.outbound import reply
 from bot.utils import get_rate_limit_minutes, get_activity_hours
 
 logger = logging.getLogger(__name__)
 
 # User states for multi-step operations
-user_states = {}
+user_states = get_conversation_states()
+
+@dataclass
+class ButtonRoute:
+    """Handler of a reply keyboard button, with call count and latency"""
+    handler: Callable[[Update, ContextTypes.DEFAULT_TYPE], Awaitable[None]]
+    admin_only: bool
+    calls: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
 
 async def handle_keyboard_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle keyboard button presses"""
     if not update.message or not update.effective_user:
         return
     
-    text = update.message.text
+    route = BUTTON_ROUTES.get(update.message.text)
+    if route is None:
+        return
     user_id = update.effective_user.id
     
     # Get or create user
-    user = get_or_create_user(user_id)
+    user = await get_or_create_user(user_id)
     if not user:
-        await update.message.reply_text("❌ خطا در دسترسی به پایگاه داده.")
+        await reply(update, "❌ خطا در دسترسی به پایگاه داده.")
         return
     
-    # Handle different button presses
-    if text == "📝 ارسال پیام":
-        await handle_send_message_button(update, context)
-    elif text == "📷 ارسال رسانه":
-        await handle_send_media_button(update, context)
-    elif text == "✏️ تنظیم نام نمایشی":
-        await handle_set_display_name_button(update, context)
-    elif text == "❓ راهنما":
-        await handle_help_button(update, context)
-    elif text == "🔗 لینک کانال":
-        await handle_channel_link_button(update, context)
-    elif text == "🔄 شروع مجدد":
-        await handle_restart_button(update, context)
-    
-    # Admin menu buttons
-    elif text == "👥 مدیریت ادمین‌ها" and is_admin(user_id):
-        await handle_admin_management_button(update, context)
-    elif text == "🚫 مدیریت کلمات نامناسب" and is_admin(user_id):
-        await handle_profanity_management_button(update, context)
-    elif text == "⚙️ تنظیمات سیستم" and is_admin(user_id):
-        await handle_settings_button(update, context)
-    elif text == "📊 آمار و گزارش" and is_admin(user_id):
-        await handle_stats_button(update, context)
-    elif text == "📋 تأیید رسانه‌ها" and is_admin(user_id):
-        await handle_media_approval_button(update, context)
-    elif text == "🔙 بازگشت به منوی کاربر":
-        await handle_back_to_user_menu(update, context)
-    
-    # Admin management submenu
-    elif text == "➕ افزودن ادمین" and is_admin(user_id):
-        await handle_add_admin_button(update, context)
-    elif text == "➖ حذف ادمین" and is_admin(user_id):
-        await handle_remove_admin_button(update, context)
-    elif text == "📋 لیست ادمین‌ها" and is_admin(user_id):
-        await handle_list_admins_button(update, context)
-    
-    # Profanity management submenu
-    elif text == "➕ افزودن کلمه" and is_admin(user_id):
-        await handle_add_profanity_button(update, context)
-    elif text == "➖ حذف کلمه" and is_admin(user_id):
-        await handle_remove_profanity_button(update, context)
-    elif text == "📋 لیست کلمات" and is_admin(user_id):
-        await handle_list_profanity_button(update, context)
-    
-    # Settings submenu
-    elif text == "⏰ تنظیم محدودیت زمانی" and is_admin(user_id):
-        await handle_set_rate_limit_button(update, context)
-    elif text == "🕐 تنظیم ساعات فعالیت" and is_admin(user_id):
-        await handle_set_activity_hours_button(update, context)
-    elif text == "📋 تغییر وضعیت تأیید" and is_admin(user_id):
-        await handle_toggle_approval_button(update, context)
-    elif text == "📊 مشاهده تنظیمات" and is_admin(user_id):
-        await handle_view_settings_button(update, context)
+    if route.admin_only and not await is_admin(user_id):
+        return
     
-    # Back button
-    elif text == "🔙 بازگشت":
-        await handle_back_button(update, context)
+    started_at = time.perf_counter()
+    try:
+        await route.handler(update, context)
+    finally:
+        elapsed = time.perf_counter() - started_at
+        route.calls += 1
+        route.total_seconds += elapsed
+        route.max_seconds = max(route.max_seconds, elapsed)
 
 async def handle_send_message_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle send message button"""
-    await update.message.reply_text(
+    await reply(
+        update,
         "📝 لطفاً پیام متنی خود را ارسال کنید:\n\n"
         "⚠️ توجه: پیام باید عاری از کلمات نامناسب باشد تا در کانال منتشر شود."
     )
 
 async def handle_send_media_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle send media button"""
-    require_approval = get_setting('require_approval') == 'true'
+    require_approval = await get_setting('require_approval') == 'true'
     approval_text = "و پس از تأیید مدیر" if require_approval else ""
     
-    await update.message.reply_text(
+    await reply(
+        update,
         f"📷 لطفاً رسانه خود (عکس، ویدیو، فایل) را ارسال کنید:\n\n"
         f"⚠️ رسانه شما بررسی {approval_text} در کانال منتشر خواهد شد."
     )
@@ -117,30 +96,31 @@ async def handle_set_display_name_button(update: Update, context: ContextTypes.D
     if not update.effective_user:
         return
         
-    user = get_or_create_user(update.effective_user.id)
+    user = await get_or_create_user(update.effective_user.id)
     if user.get('display_name_set'):
-        await update.message.reply_text(MESSAGES['name_already_set'])
+        await reply(update, MESSAGES['name_already_set'])
         return
     
     user_states[update.effective_user.id] = 'waiting_for_name'
-    await update.message.reply_text(
+    await reply(
+        update,
         "✏️ لطفاً نام نمایشی جدید خود را وارد کنید:\n\n"
         "⚠️ توجه: نام نمایشی فقط یک بار قابل تغییر است و باید یکتا باشد."
     )
 
 async def handle_help_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle help button"""
-    rate_limit = get_rate_limit_minutes()
+    rate_limit = await run_in_db_thread(get_rate_limit_minutes)
     help_msg = MESSAGES['help'].format(rate_limit)
-    await update.message.reply_text(help_msg)
+    await reply(update, help_msg)
 
 async def handle_channel_link_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle channel link button"""
     if CHANNEL_USERNAME:
         keyboard = get_channel_link_keyboard(CHANNEL_USERNAME)
-        await update.message.reply_text("🔗 لینک کانال:", reply_markup=keyboard)
+        await reply(update, "🔗 لینک کانال:", reply_markup=keyboard)
     else:
-        await update.message.reply_text("❌ لینک کانال تنظیم نشده است.")
+        await reply(update, "❌ لینک کانال تنظیم نشده است.")
 
 async def handle_restart_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle restart button"""
@@ -148,12 +128,12 @@ async def handle_restart_button(update: Update, context: ContextTypes.DEFAULT_TY
         return
         
     # Clear user state
-    if update.effective_user.id in user_states:
-        del user_states[update.effective_user.id]
+    user_states.pop(update.effective_user.id, None)
     
     # Show main menu
     keyboard = get_main_menu()
-    await update.message.reply_text(
+    await reply(
+        update,
         "🔄 ربات مجدداً راه‌اندازی شد!\n\n" + MESSAGES['welcome'],
         reply_markup=keyboard
     )
@@ -161,7 +141,8 @@ async def handle_restart_button(update: Update, context: ContextTypes.DEFAULT_TY
 async def handle_admin_management_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle admin management button"""
     keyboard = get_admin_management_menu()
-    await update.message.reply_text(
+    await reply(
+        update,
         "👥 مدیریت ادمین‌ها:\n\nلطفاً یکی از گزینه‌ها را انتخاب کنید:",
         reply_markup=keyboard
     )
@@ -169,7 +150,8 @@ async def handle_admin_management_button(update: Update, context: ContextTypes.D
 async def handle_profanity_management_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle profanity management button"""
     keyboard = get_profanity_menu()
-    await update.message.reply_text(
+    await reply(
+        update,
         "🚫 مدیریت کلمات نامناسب:\n\nلطفاً یکی از گزینه‌ها را انتخاب کنید:",
         reply_markup=keyboard
     )
@@ -177,7 +159,8 @@ async def handle_profanity_management_button(update: Update, context: ContextTyp
 async def handle_settings_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle settings button"""
     keyboard = get_settings_menu()
-    await update.message.reply_text(
+    await reply(
+        update,
         "⚙️ تنظیمات سیستم:\n\nلطفاً یکی از گزینه‌ها را انتخاب کنید:",
         reply_markup=keyboard
     )
@@ -185,11 +168,11 @@ async def handle_settings_button(update: Update, context: ContextTypes.DEFAULT_T
 async def handle_stats_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle stats button"""
     # Get system statistics
-    admins_count = len(get_all_admins())
-    profanity_count = len(get_profanity_words())
-    rate_limit = get_rate_limit_minutes()
-    start_hour, end_hour = get_activity_hours()
-    require_approval = get_setting('require_approval') == 'true'
+    admins_count = len(await get_all_admins())
+    profanity_count = len(await get_profanity_words())
+    rate_limit = await run_in_db_thread(get_rate_limit_minutes)
+    start_hour, end_hour = await run_in_db_thread(get_activity_hours)
+    require_approval = await get_setting('require_approval') == 'true'
     
     stats_text = f"""📊 آمار و وضعیت سیستم:
 
@@ -201,11 +184,12 @@ async def handle_stats_button(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 🤖 ربات فعال و آماده دریافت پیام‌هاست."""
     
-    await update.message.reply_text(stats_text)
+    await reply(update, stats_text)
 
 async def handle_media_approval_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle media approval button"""
-    await update.message.reply_text(
+    await reply(
+        update,
         "📋 برای تأیید رسانه‌ها:\n\n"
         "• پس از ارسال رسانه توسط کاربران، پیام تأیید برای شما ارسال می‌شود\n"
         "• از دکمه‌های ✅ تأیید یا ❌ رد استفاده کنید\n"
@@ -215,7 +199,7 @@ async def handle_media_approval_button(update: Update, context: ContextTypes.DEF
 async def handle_back_to_user_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle back to user menu"""
     keyboard = get_main_menu()
-    await update.message.reply_text("🔙 بازگشت به منوی اصلی:", reply_markup=keyboard)
+    await reply(update, "🔙 بازگشت به منوی اصلی:", reply_markup=keyboard)
 
 async def handle_add_admin_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle add admin button"""
@@ -223,7 +207,8 @@ async def handle_add_admin_button(update: Update, context: ContextTypes.DEFAULT_
         return
         
     user_states[update.effective_user.id] = 'waiting_for_admin_id'
-    await update.message.reply_text(
+    await reply(
+        update,
         "➕ افزودن ادمین جدید:\n\n"
         "لطفاً ID کاربری ادمین جدید را ارسال کنید:\n"
         "مثال: 123456789"
@@ -235,7 +220,8 @@ async def handle_remove_admin_button(update: Update, context: ContextTypes.DEFAU
         return
         
     user_states[update.effective_user.id] = 'waiting_for_remove_admin_id'
-    await update.message.reply_text(
+    await reply(
+        update,
         "➖ حذف ادمین:\n\n"
         "لطفاً ID کاربری ادمینی که می‌خواهید حذف کنید را ارسال کنید:\n"
         "مثال: 123456789"
@@ -243,16 +229,16 @@ async def handle_remove_admin_button(update: Update, context: ContextTypes.DEFAU
 
 async def handle_list_admins_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle list admins button"""
-    admins = get_all_admins()
+    admins = await get_all_admins()
     if not admins:
-        await update.message.reply_text("👥 هیچ ادمینی یافت نشد.")
+        await reply(update, "👥 هیچ ادمینی یافت نشد.")
         return
     
     admins_text = "👥 لیست ادمین‌ها:\n\n"
     for i, admin_id in enumerate(admins, 1):
         admins_text += f"{i}. {admin_id}\n"
     
-    await update.message.reply_text(admins_text)
+    await reply(update, admins_text)
 
 async def handle_add_profanity_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle add profanity button"""
@@ -260,7 +246,8 @@ async def handle_add_profanity_button(update: Update, context: ContextTypes.DEFA
         return
         
     user_states[update.effective_user.id] = 'waiting_for_profanity_word'
-    await update.message.reply_text(
+    await reply(
+        update,
         "➕ افزودن کلمه نامناسب:\n\n"
         "لطفاً کلمه نامناسب جدید را ارسال کنید:"
     )
@@ -271,16 +258,17 @@ async def handle_remove_profanity_button(update: Update, context: ContextTypes.D
         return
         
     user_states[update.effective_user.id] = 'waiting_for_remove_profanity'
-    await update.message.reply_text(
+    await reply(
+        update,
         "➖ حذف کلمه نامناسب:\n\n"
         "لطفاً کلمه‌ای که می‌خواهید حذف کنید را ارسال کنید:"
     )
 
 async def handle_list_profanity_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle list profanity button"""
-    words = get_profanity_words()
+    words = await get_profanity_words()
     if not words:
-        await update.message.reply_text("🚫 هیچ کلمه نامناسبی یافت نشد.")
+        await reply(update, "🚫 هیچ کلمه نامناسبی یافت نشد.")
         return
     
     # Split words into chunks to avoid message length limits
@@ -292,7 +280,7 @@ async def handle_list_profanity_button(update: Update, context: ContextTypes.DEF
         for j, word in enumerate(chunk, 1):
             words_text += f"{j + (i * chunk_size)}. {word}\n"
         
-        await update.message.reply_text(words_text)
+        await reply(update, words_text)
 
 async def handle_set_rate_limit_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle set rate limit button"""
@@ -300,8 +288,9 @@ async def handle_set_rate_limit_button(update: Update, context: ContextTypes.DEF
         return
         
     user_states[update.effective_user.id] = 'waiting_for_rate_limit'
-    current_limit = get_rate_limit_minutes()
-    await update.message.reply_text(
+    current_limit = await run_in_db_thread(get_rate_limit_minutes)
+    await reply(
+        update,
         f"⏰ تنظیم محدودیت زمانی:\n\n"
         f"محدودیت فعلی: {current_limit} دقیقه\n\n"
         f"لطفاً تعداد دقیقه جدید را وارد کنید:"
@@ -313,8 +302,9 @@ async def handle_set_activity_hours_button(update: Update, context: ContextTypes
         return
         
     user_states[update.effective_user.id] = 'waiting_for_activity_hours'
-    start_hour, end_hour = get_activity_hours()
-    await update.message.reply_text(
+    start_hour, end_hour = await run_in_db_thread(get_activity_hours)
+    await reply(
+        update,
         f"🕐 تنظیم ساعات فعالیت:\n\n"
         f"ساعات فعلی: {start_hour}:00 - {end_hour}:00\n\n"
         f"لطفاً ساعت شروع و پایان را وارد کنید:\n"
@@ -323,23 +313,23 @@ async def handle_set_activity_hours_button(update: Update, context: ContextTypes
 
 async def handle_toggle_approval_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle toggle approval button"""
-    current_setting = get_setting('require_approval')
+    current_setting = await get_setting('require_approval')
     new_setting = 'false' if current_setting == 'true' else 'true'
     
-    if set_setting('require_approval', new_setting):
+    if await set_setting('require_approval', new_setting):
         if new_setting == 'true':
-            await update.message.reply_text(MESSAGES['approval_enabled'])
+            await reply(update, MESSAGES['approval_enabled'])
         else:
-            await update.message.reply_text(MESSAGES['approval_disabled'])
+            await reply(update, MESSAGES['approval_disabled'])
     else:
-        await update.message.reply_text("❌ خطا در تغییر تنظیمات.")
+        await reply(update, "❌ خطا در تغییر تنظیمات.")
 
 async def handle_view_settings_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle view settings button"""
-    require_approval = get_setting('require_approval')
-    rate_limit = get_setting('rate_limit_minutes')
-    start_hour = get_setting('activity_start_hour')
-    end_hour = get_setting('activity_end_hour')
+    require_approval = await get_setting('require_approval')
+    rate_limit = await get_setting('rate_limit_minutes')
+    start_hour = await get_setting('activity_start_hour')
+    end_hour = await get_setting('activity_end_hour')
     
     settings_text = "⚙️ تنظیمات فعلی:\n\n"
     settings_text += f"📋 تأیید رسانه: {'فعال' if require_approval == 'true' else 'غیرفعال'}\n"
@@ -347,13 +337,13 @@ async def handle_view_settings_button(update: Update, context: ContextTypes.DEFA
     settings_text += f"🕐 ساعات فعالیت: {start_hour}:00 - {end_hour}:00\n"
     
     # Count admins and profanity words
-    admins_count = len(get_all_admins())
-    profanity_count = len(get_profanity_words())
+    admins_count = len(await get_all_admins())
+    profanity_count = len(await get_profanity_words())
     
     settings_text += f"👥 تعداد مدیران: {admins_count}\n"
     settings_text += f"🚫 تعداد کلمات نامناسب: {profanity_count}"
     
-    await update.message.reply_text(settings_text)
+    await reply(update, settings_text)
 
 async def handle_back_button(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle back button - context sensitive"""
@@ -363,16 +353,15 @@ async def handle_back_button(update: Update, context: ContextTypes.DEFAULT_TYPE)
     user_id = update.effective_user.id
     
     # Clear any active state
-    if user_id in user_states:
-        del user_states[user_id]
+    user_states.pop(user_id, None)
     
     # Determine which menu to show based on admin status
-    if is_admin(user_id):
+    if await is_admin(user_id):
         keyboard = get_admin_menu()
-        await update.message.reply_text("🔙 بازگشت به منوی ادمین:", reply_markup=keyboard)
+        await reply(update, "🔙 بازگشت به منوی ادمین:", reply_markup=keyboard)
     else:
         keyboard = get_main_menu()
-        await update.message.reply_text("🔙 بازگشت به منوی اصلی:", reply_markup=keyboard)
+        await reply(update, "🔙 بازگشت به منوی اصلی:", reply_markup=keyboard)
 
 async def handle_user_state_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle input when user is in a specific state"""
@@ -382,11 +371,10 @@ async def handle_user_state_input(update: Update, context: ContextTypes.DEFAULT_
     user_id = update.effective_user.id
     text = update.message.text.strip()
     
-    if user_id not in user_states:
+    state = user_states.get(user_id)
+    if state is None:
         return False
     
-    state = user_states[user_id]
-    
     if state == 'waiting_for_name':
         await handle_display_name_input(update, context, text)
     elif state == 'waiting_for_admin_id':
@@ -410,17 +398,16 @@ async def handle_display_name_input(update: Update, context: ContextTypes.DEFAUL
         return
         
     from bot.utils import is_valid_display_name
-    from bot.database import set_user_display_name
     
     if not is_valid_display_name(text):
-        await update.message.reply_text(MESSAGES['name_invalid'])
+        await reply(update, MESSAGES['name_invalid'])
         return
     
-    if set_user_display_name(update.effective_user.id, text):
-        await update.message.reply_text(MESSAGES['name_set'].format(text))
-        del user_states[update.effective_user.id]
+    if await set_user_display_name(update.effective_user.id, text):
+        await reply(update, MESSAGES['name_set'].format(text))
+        user_states.pop(update.effective_user.id, None)
     else:
-        await update.message.reply_text(MESSAGES['name_taken'])
+        await reply(update, MESSAGES['name_taken'])
 
 async def handle_admin_id_input(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str):
     """Handle admin ID input"""
@@ -429,13 +416,13 @@ async def handle_admin_id_input(update: Update, context: ContextTypes.DEFAULT_TY
         
     try:
         admin_id = int(text)
-        if add_admin(admin_id, update.effective_user.id):
-            await update.message.reply_text(MESSAGES['admin_added'])
+        if await add_admin(admin_id, update.effective_user.id):
+            await reply(update, MESSAGES['admin_added'])
         else:
-            await update.message.reply_text("❌ خطا در افزودن ادمین.")
-        del user_states[update.effective_user.id]
+            await reply(update, "❌ خطا در افزودن ادمین.")
+        user_states.pop(update.effective_user.id, None)
     except ValueError:
-        await update.message.reply_text("❌ لطفاً یک عدد معتبر وارد کنید.")
+        await reply(update, "❌ لطفاً یک عدد معتبر وارد کنید.")
 
 async def handle_remove_admin_id_input(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str):
     """Handle remove admin ID input"""
@@ -444,35 +431,35 @@ async def handle_remove_admin_id_input(update: Update, context: ContextTypes.DEF
         
     try:
         admin_id = int(text)
-        if remove_admin(admin_id):
-            await update.message.reply_text(MESSAGES['admin_removed'])
+        if await remove_admin(admin_id):
+            await reply(update, MESSAGES['admin_removed'])
         else:
-            await update.message.reply_text(MESSAGES['admin_not_found'])
-        del user_states[update.effective_user.id]
+            await reply(update, MESSAGES['admin_not_found'])
+        user_states.pop(update.effective_user.id, None)
     except ValueError:
-        await update.message.reply_text("❌ لطفاً یک عدد معتبر وارد کنید.")
+        await reply(update, "❌ لطفاً یک عدد معتبر وارد کنید.")
 
 async def handle_profanity_word_input(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str):
     """Handle profanity word input"""
     if not update.effective_user or not update.message:
         return
         
-    if add_profanity_word(text.lower(), update.effective_user.id):
-        await update.message.reply_text(MESSAGES['profanity_added'])
+    if await add_profanity_word(text.lower(), update.effective_user.id):
+        await reply(update, MESSAGES['profanity_added'])
     else:
-        await update.message.reply_text("❌ خطا در افزودن کلمه.")
-    del user_states[update.effective_user.id]
+        await reply(update, "❌ خطا در افزودن کلمه.")
+    user_states.pop(update.effective_user.id, None)
 
 async def handle_remove_profanity_input(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str):
     """Handle remove profanity input"""
     if not update.effective_user or not update.message:
         return
         
-    if remove_profanity_word(text.lower()):
-        await update.message.reply_text(MESSAGES['profanity_removed'])
+    if await remove_profanity_word(text.lower()):
+        await reply(update, MESSAGES['profanity_removed'])
     else:
-        await update.message.reply_text(MESSAGES['profanity_not_found'])
-    del user_states[update.effective_user.id]
+        await reply(update, MESSAGES['profanity_not_found'])
+    user_states.pop(update.effective_user.id, None)
 
 async def handle_rate_limit_input(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str):
     """Handle rate limit input"""
@@ -482,16 +469,16 @@ async def handle_rate_limit_input(update: Update, context: ContextTypes.DEFAULT_
     try:
         minutes = int(text)
         if minutes < 0:
-            await update.message.reply_text("❌ تعداد دقیقه باید مثبت باشد.")
+            await reply(update, "❌ تعداد دقیقه باید مثبت باشد.")
             return
         
-        if set_setting('rate_limit_minutes', str(minutes)):
-            await update.message.reply_text(MESSAGES['rate_limit_set'].format(minutes))
+        if await set_setting('rate_limit_minutes', str(minutes)):
+            await reply(update, MESSAGES['rate_limit_set'].format(minutes))
         else:
-            await update.message.reply_text("❌ خطا در تنظیم محدودیت زمانی.")
-        del user_states[update.effective_user.id]
+            await reply(update, "❌ خطا در تنظیم محدودیت زمانی.")
+        user_states.pop(update.effective_user.id, None)
     except ValueError:
-        await update.message.reply_text("❌ لطفاً یک عدد معتبر وارد کنید.")
+        await reply(update, "❌ لطفاً یک عدد معتبر وارد کنید.")
 
 async def handle_activity_hours_input(update: Update, context: ContextTypes.DEFAULT_TYPE, text: str):
     """Handle activity hours input"""
@@ -501,20 +488,71 @@ async def handle_activity_hours_input(update: Update, context: ContextTypes.DEFA
     try:
         parts = text.split()
         if len(parts) != 2:
-            await update.message.reply_text("❌ لطفاً دو عدد وارد کنید. مثال: 8 22")
+            await reply(update, "❌ لطفاً دو عدد وارد کنید. مثال: 8 22")
             return
         
         start_hour = int(parts[0])
         end_hour = int(parts[1])
         
         if not (0 <= start_hour <= 23) or not (0 <= end_hour <= 23):
-            await update.message.reply_text("❌ ساعت باید بین 0 تا 23 باشد.")
+            await reply(update, "❌ ساعت باید بین 0 تا 23 باشد.")
             return
         
-        if set_setting('activity_start_hour', str(start_hour)) and set_setting('activity_end_hour', str(end_hour)):
-            await update.message.reply_text(MESSAGES['activity_hours_set'].format(start_hour, end_hour))
+        if await set_setting('activity_start_hour', str(start_hour)) and await set_setting('activity_end_hour', str(end_hour)):
+            await reply(update, MESSAGES['activity_hours_set'].format(start_hour, end_hour))
         else:
-            await update.message.reply_text("❌ خطا در تنظیم ساعات فعالیت.")
-        del user_states[update.effective_user.id]
+            await reply(update, "❌ خطا در تنظیم ساعات فعالیت.")
+        user_states.pop(update.effective_user.id, None)
     except ValueError:
-        await update.message.reply_text("❌ لطفاً دو عدد معتبر وارد کنید.")
\ No newline at end of file
+        await reply(update, "❌ لطفاً دو عدد معتبر وارد کنید.")
+
+# Handler for each button label and whether only admins may use it
+_BUTTON_HANDLERS = {
+    BTN_SEND_MESSAGE: (handle_send_message_button, False),
+    BTN_SEND_MEDIA: (handle_send_media_button, False),
+    BTN_SET_DISPLAY_NAME: (handle_set_display_name_button, False),
+    BTN_HELP: (handle_help_button, False),
+    BTN_CHANNEL_LINK: (handle_channel_link_button, False),
+    BTN_RESTART: (handle_restart_button, False),
+    BTN_ADMIN_MANAGEMENT: (handle_admin_management_button, True),
+    BTN_PROFANITY_MANAGEMENT: (handle_profanity_management_button, True),
+    BTN_SETTINGS: (handle_settings_button, True),
+    BTN_STATS: (handle_stats_button, True),
+    BTN_MEDIA_APPROVAL: (handle_media_approval_button, True),
+    BTN_BACK_TO_USER_MENU: (handle_back_to_user_menu, False),
+    BTN_ADD_ADMIN: (handle_add_admin_button, True),
+    BTN_REMOVE_ADMIN: (handle_remove_admin_button, True),
+    BTN_LIST_ADMINS: (handle_list_admins_button, True),
+    BTN_ADD_PROFANITY: (handle_add_profanity_button, True),
+    BTN_REMOVE_PROFANITY: (handle_remove_profanity_button, True),
+    BTN_LIST_PROFANITY: (handle_list_profanity_button, True),
+    BTN_SET_RATE_LIMIT: (handle_set_rate_limit_button, True),
+    BTN_SET_ACTIVITY_HOURS: (handle_set_activity_hours_button, True),
+    BTN_TOGGLE_APPROVAL: (handle_toggle_approval_button, True),
+    BTN_VIEW_SETTINGS: (handle_view_settings_button, True),
+    BTN_BACK: (handle_back_button, False),
+}
+
+def _build_button_routes() -> Dict[str, ButtonRoute]:
+    """Route every label of the menu keyboards, failing at import if one has no handler"""
+    missing = menu_labels() - _BUTTON_HANDLERS.keys()
+    if missing:
+        raise RuntimeError(f"Keyboard buttons without a handler: {sorted(missing)}")
+    return {
+        label: ButtonRoute(handler, admin_only)
+        for label, (handler, admin_only) in _BUTTON_HANDLERS.items()
+    }
+
+# Button label -> route, the single table message_handler dispatches through
+BUTTON_ROUTES = _build_button_routes()
+
+def get_route_metrics() -> dict:
+    """Snapshot of call counts and latency per keyboard button"""
+    return {
+        label: {
+            'calls': route.calls,
+            'avg_ms': route.total_seconds / route.calls * 1000 if route.calls else 0.0,
+            'max_ms': route.max_seconds * 1000,
+        }
+        for label, route in BUTTON_ROUTES.items()
+    }
@@ -0,0 +1,217 @@
+"""
+Versioned schema migrations for the bot database
+"""
+
+import logging
+import sqlite3
+from typing import List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Ordered list of (version, description, statements). Applied migrations are
+# recorded in the schema_version table; never edit or reorder a released
+# migration, append a new one instead.
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, "Baseline schema", [
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            telegram_id INTEGER UNIQUE NOT NULL,
+            display_name TEXT UNIQUE,
+            display_name_set BOOLEAN DEFAULT FALSE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_message_at TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS admins (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            telegram_id INTEGER UNIQUE NOT NULL,
+            added_by INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS profanity_words (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            word TEXT UNIQUE NOT NULL,
+            added_by INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS pending_media (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_telegram_id INTEGER NOT NULL,
+            message_id INTEGER NOT NULL,
+            file_id TEXT NOT NULL,
+            file_type TEXT NOT NULL,
+            caption TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS message_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_telegram_id INTEGER NOT NULL,
+            message_type TEXT NOT NULL,
+            status TEXT NOT NULL,
+            reason TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+    ]),
+    (2, "Indexes for message log and pending media queries", [
+        'CREATE INDEX IF NOT EXISTS idx_message_logs_user_created ON message_logs (user_telegram_id, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_message_logs_status_created ON message_logs (status, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_pending_media_created ON pending_media (created_at)',
+    ]),
+    (3, "Persisted rate limiter state", [
+        '''
+        CREATE TABLE IF NOT EXISTS rate_limits (
+            telegram_id INTEGER PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+        ''',
+    ]),
+    (4, "Outbox for channel publications", [
+        '''
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_telegram_id INTEGER NOT NULL,
+            message_type TEXT NOT NULL,
+            source TEXT NOT NULL,
+            text TEXT NOT NULL,
+            file_id TEXT,
+            state TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL DEFAULT 0,
+            last_error TEXT,
+            channel_message_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_outbox_pending ON outbox (next_attempt_at) WHERE state = 'pending'",
+        'CREATE INDEX IF NOT EXISTS idx_outbox_state_finished ON outbox (state, finished_at)',
+    ]),
+    (5, "Moderation state for pending media", [
+        "ALTER TABLE pending_media ADD COLUMN state TEXT NOT NULL DEFAULT 'pending'",
+        'ALTER TABLE pending_media ADD COLUMN decided_by INTEGER',
+        'ALTER TABLE pending_media ADD COLUMN decided_at TIMESTAMP',
+        'CREATE INDEX IF NOT EXISTS idx_pending_media_state_decided ON pending_media (state, decided_at)',
+    ]),
+    (6, "Approval prompts sent to admins", [
+        '''
+        CREATE TABLE IF NOT EXISTS approval_prompts (
+            media_id INTEGER NOT NULL,
+            chat_id INTEGER NOT NULL,
+            message_id INTEGER NOT NULL,
+            PRIMARY KEY (media_id, chat_id)
+        )
+        ''',
+    ]),
+    (7, "Album items for pending media and outbox entries", [
+        'ALTER TABLE pending_media ADD COLUMN items TEXT',
+        'ALTER TABLE outbox ADD COLUMN items TEXT',
+    ]),
+    (8, "Duplicate media detection", [
+        'ALTER TABLE pending_media ADD COLUMN file_unique_id TEXT',
+        "CREATE INDEX IF NOT EXISTS idx_pending_media_unique_pending ON pending_media (file_unique_id) WHERE state = 'pending'",
+        '''
+        CREATE TABLE IF NOT EXISTS media_history (
+            file_unique_id TEXT PRIMARY KEY,
+            decision TEXT NOT NULL,
+            decided_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_media_history_decided ON media_history (decided_at)',
+    ]),
+    (9, "Persisted conversation states", [
+        '''
+        CREATE TABLE IF NOT EXISTS conversation_states (
+            telegram_id INTEGER PRIMARY KEY,
+            state TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_conversation_states_expires ON conversation_states (expires_at)',
+    ]),
+    (10, "Change counters for cached tables", [
+        '''
+        CREATE TABLE IF NOT EXISTS cache_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        "INSERT OR IGNORE INTO cache_versions (name) VALUES ('settings'), ('admins'), ('profanity_words')",
+    ] + [
+        f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_version AFTER {event} ON {table}
+        BEGIN
+            UPDATE cache_versions SET version = version + 1 WHERE name = '{table}';
+        END
+        '''
+        for table in ('settings', 'admins', 'profanity_words')
+        for event in ('INSERT', 'UPDATE', 'DELETE')
+    ]),
+    (11, "Caption of the approved submission in media history", [
+        'ALTER TABLE media_history ADD COLUMN caption_hash TEXT',
+    ]),
+    (12, "Instance holding each outbox lease", [
+        'ALTER TABLE outbox ADD COLUMN leased_by TEXT',
+    ]),
+]
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Get the highest applied migration version (0 for a fresh database)"""
+    row = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()
+    return row[0] or 0
+
+def run_migrations(conn: sqlite3.Connection) -> int:
+    """Apply pending migrations in order, each in its own transaction
+
+    Returns the schema version after migrating.
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.commit()
+
+    version = get_schema_version(conn)
+    for target, description, statements in MIGRATIONS:
+        if target <= version:
+            continue
+
+        # Take the write lock first so two processes cannot apply the same migration
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if get_schema_version(conn) >= target:
+                conn.rollback()
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute('''
+                INSERT INTO schema_version (version, description) VALUES (?, ?)
+            ''', (target, description))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        version = target
+        logger.info(f"Applied database migration {target}: {description}")
+
+    return version
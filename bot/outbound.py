@@ -0,0 +1,300 @@
+"""
+Flood-control-aware scheduler for outgoing Bot API calls
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from telegram import CallbackQuery, Update
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+from bot.config import (
+    CHANNEL_ID, OUTBOUND_GLOBAL_PER_SECOND, OUTBOUND_CHANNEL_PER_MINUTE,
+    OUTBOUND_CHAT_PER_SECOND, OUTBOUND_MAX_RETRIES, OUTBOUND_IDLE_SECONDS,
+    FANOUT_CONCURRENCY, FANOUT_TIMEOUT_SECONDS, FANOUT_RETRIES
+)
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Token bucket that can also be paused, e.g. after a RetryAfter"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token can be taken (0 if one is available now)"""
+        self._refill(now)
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        return max(wait, self.blocked_until - now)
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def block(self, seconds: float):
+        """Stop handing out tokens for the given number of seconds"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+@dataclass
+class _Job:
+    method: Callable[..., Awaitable[Any]]
+    args: tuple
+    kwargs: dict
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+@dataclass
+class OutboundMetrics:
+    """Counters describing the scheduler since startup"""
+    sent: int = 0
+    failed: int = 0
+    retry_after: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+class OutboundScheduler:
+    """Pace Bot API calls per destination chat and globally
+
+    Every destination gets its own FIFO queue, worker task and token bucket
+    (the channel is limited per minute, private chats per second), and all
+    calls also share one global bucket. A RetryAfter from Telegram pauses the
+    destination for the requested time and the call is retried, up to
+    ``max_retries`` times. Idle destinations release their worker and queue.
+    """
+
+    def __init__(self, global_per_second: float = OUTBOUND_GLOBAL_PER_SECOND,
+                 channel_per_minute: float = OUTBOUND_CHANNEL_PER_MINUTE,
+                 chat_per_second: float = OUTBOUND_CHAT_PER_SECOND,
+                 max_retries: int = OUTBOUND_MAX_RETRIES,
+                 idle_seconds: float = OUTBOUND_IDLE_SECONDS):
+        self._global = TokenBucket(global_per_second, global_per_second)
+        self._channel_per_minute = channel_per_minute
+        self._chat_per_second = chat_per_second
+        self._max_retries = max_retries
+        self._idle_seconds = idle_seconds
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self.metrics = OutboundMetrics()
+
+    def _bucket_for(self, key: str) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if CHANNEL_ID and key == str(CHANNEL_ID):
+                bucket = TokenBucket(self._channel_per_minute / 60, 1)
+            else:
+                bucket = TokenBucket(self._chat_per_second, 1)
+            self._buckets[key] = bucket
+        return bucket
+
+    def submit(self, destination, method: Callable[..., Awaitable[Any]], /, *args, **kwargs) -> asyncio.Future:
+        """Queue a call to the destination chat and return a future for its result without waiting"""
+        key = str(destination)
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = asyncio.Queue()
+            self._workers[key] = asyncio.create_task(self._worker(key, queue), name=f"outbound-{key}")
+        queue.put_nowait(_Job(method, args, kwargs, future))
+        return future
+
+    async def send(self, destination, method: Callable[..., Awaitable[Any]], /, *args, **kwargs) -> Any:
+        """Queue a call to the destination chat and wait for its result"""
+        return await self.submit(destination, method, *args, **kwargs)
+
+    async def _acquire(self, bucket: TokenBucket):
+        while True:
+            now = time.monotonic()
+            delay = max(bucket.delay(now), self._global.delay(now))
+            if delay <= 0:
+                bucket.take(now)
+                self._global.take(now)
+                return
+            await asyncio.sleep(delay)
+
+    async def _worker(self, key: str, queue: asyncio.Queue):
+        bucket = self._bucket_for(key)
+        while True:
+            try:
+                job = await asyncio.wait_for(queue.get(), self._idle_seconds)
+            except asyncio.TimeoutError:
+                if queue.empty():
+                    del self._queues[key]
+                    del self._workers[key]
+                    self._buckets.pop(key, None)
+                    return
+                continue
+
+            if job.future.cancelled():
+                continue
+
+            await self._acquire(bucket)
+            if job.future.cancelled():
+                # The caller gave up while the job waited for its turn
+                continue
+            wait = time.monotonic() - job.enqueued_at
+            self.metrics.total_wait += wait
+            self.metrics.max_wait = max(self.metrics.max_wait, wait)
+
+            retries = 0
+            while True:
+                try:
+                    result = await job.method(*job.args, **job.kwargs)
+                except RetryAfter as e:
+                    self.metrics.retry_after += 1
+                    retry_after = e.retry_after
+                    if isinstance(retry_after, timedelta):
+                        retry_after = retry_after.total_seconds()
+                    bucket.block(float(retry_after))
+                    if retries < self._max_retries:
+                        retries += 1
+                        logger.warning(f"Flood limit for {key}, retrying in {retry_after}s")
+                        await self._acquire(bucket)
+                        if job.future.cancelled():
+                            break
+                        continue
+                    self._finish(job, exception=e)
+                except Exception as e:
+                    self._finish(job, exception=e)
+                else:
+                    self._finish(job, result=result)
+                break
+
+    def _finish(self, job: _Job, result: Any = None, exception: Optional[BaseException] = None):
+        if exception is not None:
+            self.metrics.failed += 1
+            if not job.future.done():
+                job.future.set_exception(exception)
+        else:
+            self.metrics.sent += 1
+            if not job.future.done():
+                job.future.set_result(result)
+
+    async def close(self):
+        """Stop the destination workers, failing calls that are still queued"""
+        workers = list(self._workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        for queue in self._queues.values():
+            while not queue.empty():
+                job = queue.get_nowait()
+                if not job.future.done():
+                    job.future.cancel()
+        self._queues.clear()
+        self._workers.clear()
+        self._buckets.clear()
+
+    def queue_depth(self) -> int:
+        """Number of calls waiting across all destinations"""
+        # Copy the queues first: metrics are also read from the keep-alive thread
+        return sum(queue.qsize() for queue in list(self._queues.values()))
+
+    def get_metrics(self) -> dict:
+        """Snapshot of queue depth, wait times and outcome counters"""
+        metrics = self.metrics
+        finished = metrics.sent + metrics.failed
+        return {
+            'queue_depth': self.queue_depth(),
+            'destinations': len(self._queues),
+            'sent': metrics.sent,
+            'failed': metrics.failed,
+            'retry_after': metrics.retry_after,
+            'avg_wait_ms': metrics.total_wait / finished * 1000 if finished else 0.0,
+            'max_wait_ms': metrics.max_wait * 1000,
+        }
+
+_scheduler: Optional[OutboundScheduler] = None
+
+def get_outbound_scheduler() -> OutboundScheduler:
+    """Get the shared outbound scheduler"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = OutboundScheduler()
+    return _scheduler
+
+async def reply(update: Update, text: str, **kwargs) -> Any:
+    """Reply in the update's chat through the outbound scheduler
+
+    Every message a handler sends to a user goes through here, so replies
+    share the chat's pacing with the bot's other calls to that chat.
+    Callback query answers are not chat messages and are sent directly.
+    """
+    return await get_outbound_scheduler().send(
+        update.effective_chat.id, update.effective_message.reply_text, text, **kwargs
+    )
+
+async def edit_reply(query: CallbackQuery, text: str, **kwargs) -> Any:
+    """Edit the message a callback query came from through the outbound scheduler"""
+    return await get_outbound_scheduler().send(
+        query.message.chat_id, query.edit_message_text, text, **kwargs
+    )
+
+@dataclass
+class Delivery:
+    """Outcome of one chat's call in fan_out"""
+    chat_id: int
+    result: Any = None
+    error: Optional[BaseException] = None
+    attempts: int = 0
+    latency: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+async def fan_out(chat_ids: Iterable[int], call: Callable[[int], Awaitable[Any]],
+                  concurrency: int = FANOUT_CONCURRENCY, timeout: float = FANOUT_TIMEOUT_SECONDS,
+                  retries: int = FANOUT_RETRIES) -> List[Delivery]:
+    """Make call(chat_id) for every chat concurrently through the outbound scheduler
+
+    At most ``concurrency`` chats are in flight at once. Each attempt's Bot
+    API call has its own timeout, which starts once the scheduler runs it:
+    time spent queued behind a chat's rate limit never counts against it.
+    Timeouts and network errors are retried up to ``retries`` times. A
+    failing chat never affects the others: its error is returned in its
+    Delivery, in the same order as chat_ids.
+    """
+    scheduler = get_outbound_scheduler()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def attempt(chat_id: int):
+        return await asyncio.wait_for(call(chat_id), timeout)
+
+    async def deliver(chat_id: int) -> Delivery:
+        delivery = Delivery(chat_id)
+        async with semaphore:
+            started = time.monotonic()
+            while True:
+                delivery.attempts += 1
+                try:
+                    delivery.result = await scheduler.send(chat_id, attempt, chat_id)
+                    delivery.error = None
+                    break
+                except BadRequest as e:
+                    delivery.error = e
+                    break
+                except (asyncio.TimeoutError, NetworkError) as e:
+                    delivery.error = e
+                    if delivery.attempts > retries:
+                        break
+                except Exception as e:
+                    delivery.error = e
+                    break
+            delivery.latency = time.monotonic() - started
+        return delivery
+
+    return list(await asyncio.gather(*(deliver(chat_id) for chat_id in chat_ids)))
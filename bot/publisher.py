@@ -0,0 +1,207 @@
+"""
+Background publisher that drains the channel outbox
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Optional
+
+from telegram import InputMediaAudio, InputMediaDocument, InputMediaPhoto, InputMediaVideo
+from telegram.error import BadRequest, TelegramError
+
+from bot.async_database import (
+    claim_due_outbox, release_outbox_leases, mark_outbox_delivered,
+    mark_outbox_retry, mark_outbox_failed, log_message
+)
+from bot.keyboards import get_channel_link_keyboard
+from bot.outbound import get_outbound_scheduler
+from bot.config import (
+    MESSAGES, CHANNEL_ID, CHANNEL_USERNAME, OUTBOX_BATCH_SIZE, OUTBOX_LEASE_SECONDS,
+    OUTBOX_POLL_SECONDS, OUTBOX_MAX_ATTEMPTS, OUTBOX_BACKOFF_BASE_SECONDS, OUTBOX_BACKOFF_MAX_SECONDS,
+    INSTANCE_ID
+)
+
+logger = logging.getLogger(__name__)
+
+# Bot method and file argument used to post each media type
+_MEDIA_SENDERS = {
+    'photo': ('send_photo', 'photo'),
+    'video': ('send_video', 'video'),
+    'audio': ('send_audio', 'audio'),
+    'voice': ('send_voice', 'voice'),
+    'document': ('send_document', 'document'),
+}
+
+# Input media class for each type that can appear in an album
+_ALBUM_MEDIA = {
+    'photo': InputMediaPhoto,
+    'video': InputMediaVideo,
+    'audio': InputMediaAudio,
+    'document': InputMediaDocument,
+}
+
+# Media types that can be sent as part of an album
+ALBUM_MEDIA_TYPES = frozenset(_ALBUM_MEDIA)
+
+_FAILURE_MESSAGES = {
+    'text': "❌ خطا در ارسال پیام به کانال.",
+    'media': "❌ خطا در ارسال رسانه به کانال.",
+}
+
+async def send_channel_link(bot, chat_id: int):
+    """Send the channel link button to a user through the outbound scheduler"""
+    if not CHANNEL_USERNAME:
+        return
+    await get_outbound_scheduler().send(
+        chat_id, bot.send_message, chat_id=chat_id, text="🔗 لینک کانال:",
+        reply_markup=get_channel_link_keyboard(CHANNEL_USERNAME)
+    )
+
+def backoff_seconds(attempts: int) -> float:
+    """Delay before the next attempt after the given number of failed attempts"""
+    return min(OUTBOX_BACKOFF_MAX_SECONDS, OUTBOX_BACKOFF_BASE_SECONDS * 2 ** (attempts - 1))
+
+class OutboxPublisher:
+    """Publish outbox entries to the channel with retries
+
+    Entries are claimed in batches and sent in order through the outbound
+    scheduler. A delivered entry records the channel message ID; a failed
+    one is retried with exponential backoff until OUTBOX_MAX_ATTEMPTS, or
+    given up on at once if Telegram rejects the request itself. On start
+    every undelivered entry is replayed, including ones claimed by a
+    process that died before settling them.
+    """
+
+    def __init__(self):
+        self._bot = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    def start(self, bot):
+        """Start draining the outbox on the running event loop"""
+        self._bot = bot
+        self._task = asyncio.create_task(self._run(), name="outbox-publisher")
+
+    def wake(self):
+        """Publish newly queued entries without waiting for the next poll"""
+        self._wakeup.set()
+
+    async def stop(self):
+        """Stop the publisher; unsettled entries stay in the outbox for the next start"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self):
+        replayed = await release_outbox_leases(INSTANCE_ID)
+        if replayed:
+            logger.info(f"Replaying {replayed} undelivered channel posts")
+
+        while True:
+            self._wakeup.clear()
+            try:
+                entries = await claim_due_outbox(OUTBOX_BATCH_SIZE, OUTBOX_LEASE_SECONDS, INSTANCE_ID)
+                if entries:
+                    await asyncio.gather(*(self._publish(entry) for entry in entries))
+                    continue
+            except Exception as e:
+                logger.error(f"Error draining outbox: {e}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    def _submit(self, entry: dict) -> asyncio.Future:
+        scheduler = get_outbound_scheduler()
+        if entry['message_type'] == 'text':
+            return scheduler.submit(
+                CHANNEL_ID, self._bot.send_message,
+                chat_id=CHANNEL_ID, text=entry['text'], parse_mode='HTML'
+            )
+
+        if entry['message_type'] == 'album':
+            # The caption goes on the first item, which is how Telegram shows an album caption
+            items = json.loads(entry['items'])
+            media = [
+                _ALBUM_MEDIA[item['type']](
+                    item['file_id'],
+                    caption=entry['text'] if index == 0 else None,
+                    parse_mode='HTML' if index == 0 else None
+                )
+                for index, item in enumerate(items)
+            ]
+            return scheduler.submit(CHANNEL_ID, self._bot.send_media_group, chat_id=CHANNEL_ID, media=media)
+
+        method_name, file_argument = _MEDIA_SENDERS[entry['message_type']]
+        return scheduler.submit(
+            CHANNEL_ID, getattr(self._bot, method_name),
+            chat_id=CHANNEL_ID, caption=entry['text'], parse_mode='HTML',
+            **{file_argument: entry['file_id']}
+        )
+
+    async def _publish(self, entry: dict):
+        try:
+            submission = self._submit(entry)
+        except (KeyError, ValueError) as e:
+            # An entry that cannot even be turned into a request will never succeed
+            await self._give_up(entry, e)
+            return
+        try:
+            message = await submission
+        except BadRequest as e:
+            await self._give_up(entry, e)
+        except Exception as e:
+            attempts = entry['attempts'] + 1
+            if attempts >= OUTBOX_MAX_ATTEMPTS:
+                await self._give_up(entry, e)
+                return
+            delay = backoff_seconds(attempts)
+            logger.warning(f"Error publishing outbox entry {entry['id']}, retrying in {delay}s: {e}")
+            await mark_outbox_retry(entry['id'], str(e), time.time() + delay)
+        else:
+            # send_media_group returns one message per album item
+            if isinstance(message, (list, tuple)):
+                message = message[0]
+            await mark_outbox_delivered(entry['id'], message.message_id)
+            await self._delivered(entry)
+
+    async def _delivered(self, entry: dict):
+        user_id = entry['user_telegram_id']
+        if entry['source'] != 'approval':
+            await log_message(user_id, entry['message_type'], 'sent')
+            return
+
+        try:
+            await get_outbound_scheduler().send(
+                user_id, self._bot.send_message,
+                chat_id=user_id, text=MESSAGES['media_approved'].format(CHANNEL_USERNAME)
+            )
+            await send_channel_link(self._bot, user_id)
+        except TelegramError as e:
+            logger.error(f"Error notifying user about approval: {e}")
+
+    async def _give_up(self, entry: dict, error: Exception):
+        logger.error(f"Giving up on outbox entry {entry['id']}: {error}")
+        user_id = entry['user_telegram_id']
+        await mark_outbox_failed(entry['id'], str(error))
+        await log_message(user_id, entry['message_type'], 'error', str(error))
+
+        text = _FAILURE_MESSAGES['text' if entry['message_type'] == 'text' else 'media']
+        try:
+            await get_outbound_scheduler().send(user_id, self._bot.send_message, chat_id=user_id, text=text)
+        except TelegramError as e:
+            logger.error(f"Error notifying user about failed post: {e}")
+
+_publisher: Optional[OutboxPublisher] = None
+
+def get_outbox_publisher() -> OutboxPublisher:
+    """Get the shared outbox publisher"""
+    global _publisher
+    if _publisher is None:
+        _publisher = OutboxPublisher()
+    return _publisher
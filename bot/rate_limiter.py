@@ -0,0 +1,121 @@
+"""
+In-memory per-user rate limiting
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from bot.config import RATE_LIMIT_BURST
+from bot.database import get_settings, load_rate_limit_state, save_rate_limit_state
+
+logger = logging.getLogger(__name__)
+
+class RateLimiter:
+    """Token bucket per key on the monotonic clock
+
+    Each key holds up to ``burst`` tokens and regains one token every
+    ``interval_seconds()`` seconds. ``try_acquire`` checks and consumes a
+    token under one lock, so concurrent updates from the same user cannot
+    both pass. Buckets that have refilled completely carry no information
+    and are dropped by ``prune``, which keeps memory bounded by the number
+    of recently active users.
+    """
+
+    def __init__(self, interval_seconds: Callable[[], float], burst: int = 1):
+        self._interval_seconds = interval_seconds
+        self._burst = max(1, burst)
+        # key -> (tokens, monotonic time the token count was computed)
+        self._buckets: Dict[Hashable, Tuple[float, float]] = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def _refill(self, key: Hashable, now: float, interval: float) -> float:
+        tokens, updated = self._buckets.get(key, (self._burst, now))
+        return min(self._burst, tokens + (now - updated) / interval)
+
+    def try_acquire(self, key: Hashable) -> Tuple[bool, float]:
+        """Take one token if available
+
+        Returns (allowed, seconds until the next token is available).
+        """
+        interval = self._interval_seconds()
+        if interval <= 0:
+            return True, 0.0
+
+        now = time.monotonic()
+        with self._lock:
+            tokens = self._refill(key, now, interval)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                self._dirty.add(key)
+                return True, 0.0
+            return False, (1 - tokens) * interval
+
+    def prune(self) -> int:
+        """Drop buckets that are full again; returns how many were dropped"""
+        interval = self._interval_seconds()
+        now = time.monotonic()
+        with self._lock:
+            if interval <= 0:
+                full = list(self._buckets)
+            else:
+                full = [key for key in self._buckets if self._refill(key, now, interval) >= self._burst]
+            for key in full:
+                del self._buckets[key]
+        return len(full)
+
+    def export_dirty(self) -> List[Tuple[Hashable, float, float]]:
+        """Get (key, tokens, wall-clock time) for buckets changed since the last export"""
+        now = time.monotonic()
+        wall_now = time.time()
+        with self._lock:
+            rows = [
+                (key, self._buckets[key][0], wall_now - (now - self._buckets[key][1]))
+                for key in self._dirty if key in self._buckets
+            ]
+            self._dirty.clear()
+        return rows
+
+    def load(self, rows: List[Tuple[Hashable, float, float]]):
+        """Restore buckets saved by export_dirty, converting wall-clock times back"""
+        now = time.monotonic()
+        wall_now = time.time()
+        with self._lock:
+            for key, tokens, updated_at in rows:
+                elapsed = max(0.0, wall_now - updated_at)
+                self._buckets[key] = (min(self._burst, tokens), now - elapsed)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+_rate_limiter: Optional[RateLimiter] = None
+
+def get_rate_limiter() -> RateLimiter:
+    """Get the shared per-user message rate limiter"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter(
+            lambda: get_settings().rate_limit_minutes * 60,
+            burst=RATE_LIMIT_BURST
+        )
+    return _rate_limiter
+
+def consume_message_allowance(telegram_id: int) -> Tuple[bool, float]:
+    """Atomically check and consume one message from a user's allowance"""
+    return get_rate_limiter().try_acquire(telegram_id)
+
+def persist_rate_limits():
+    """Save changed buckets and forget the ones that have refilled"""
+    limiter = get_rate_limiter()
+    limiter.prune()
+    window = get_settings().rate_limit_minutes * 60 * RATE_LIMIT_BURST
+    save_rate_limit_state(limiter.export_dirty(), time.time() - window)
+
+def restore_rate_limits():
+    """Load saved buckets so limits survive a restart"""
+    window = get_settings().rate_limit_minutes * 60 * RATE_LIMIT_BURST
+    rows = load_rate_limit_state(time.time() - window)
+    get_rate_limiter().load(rows)
+    logger.info(f"Restored {len(rows)} rate limit buckets")
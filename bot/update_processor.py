@@ -0,0 +1,185 @@
+"""
+Concurrent update processing that keeps each user's updates in order
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Any, Awaitable, Dict, Hashable, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from bot.config import UPDATE_CONCURRENCY, UPDATE_MAX_ADMITTED
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class UpdateProcessorMetrics:
+    """Counters describing update processing since startup"""
+    processed: int = 0
+    failed: int = 0
+    max_in_flight: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    total_duration: float = 0.0
+
+class _UserTurn:
+    """Lock serializing one user's updates, with the number of updates holding or awaiting it"""
+    __slots__ = ('lock', 'references', 'albums')
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.references = 0
+        # media_group_id -> event set once the album's first item holds the turn
+        self.albums: Dict[str, asyncio.Event] = {}
+
+class UserOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Process updates of different users concurrently and each user's in order
+
+    Updates are keyed by their sender (or chat, for updates without one).
+    Updates with the same key wait for each other on a FIFO lock, so a
+    user's messages, button presses and prompt replies are handled exactly
+    in the order they arrived; the lock is dropped as soon as no update of
+    that user is pending. At most ``max_concurrent_updates`` updates run at
+    once across all users. The cap is only taken once a user's turn has
+    come, so a user flooding the bot cannot fill it with updates that are
+    merely waiting; ``max_admitted_updates`` bounds running plus waiting
+    updates and is what python-telegram-bot sees as the processor's limit.
+
+    An album arrives as one update per item. Its first item takes the turn
+    like any update and keeps it until the whole album is handled; the
+    other items only join that album, so they skip the turn and the cap
+    once the first item holds it, instead of queueing behind it.
+    """
+
+    def __init__(self, max_concurrent_updates: int = UPDATE_CONCURRENCY,
+                 max_admitted_updates: int = UPDATE_MAX_ADMITTED):
+        super().__init__(max(max_concurrent_updates, max_admitted_updates))
+        self._running = asyncio.BoundedSemaphore(max_concurrent_updates)
+        self._turns: Dict[Hashable, _UserTurn] = {}
+        self._in_flight = 0
+        self._waiting = 0
+        self.metrics = UpdateProcessorMetrics()
+
+    @staticmethod
+    def _key(update: object) -> Optional[Hashable]:
+        if isinstance(update, Update):
+            if update.effective_user is not None:
+                return update.effective_user.id
+            if update.effective_chat is not None:
+                return update.effective_chat.id
+        return None
+
+    @staticmethod
+    def _album_id(update: object) -> Optional[str]:
+        if isinstance(update, Update) and update.message is not None:
+            return update.message.media_group_id
+        return None
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]):
+        key = self._key(update)
+        turn = None
+        if key is not None:
+            turn = self._turns.get(key)
+            if turn is None:
+                turn = self._turns[key] = _UserTurn()
+            turn.references += 1
+
+        album_id = self._album_id(update) if turn is not None else None
+        album_started = None
+        if album_id is not None:
+            album_started = turn.albums.get(album_id)
+            if album_started is not None:
+                # A later item of an album whose first item is pending or running
+                try:
+                    await self._join_album(album_started, coroutine)
+                finally:
+                    self._release(key, turn)
+                return
+            album_started = turn.albums[album_id] = asyncio.Event()
+
+        enqueued_at = time.monotonic()
+        self._waiting += 1
+        waiting = True
+        try:
+            async with turn.lock if turn is not None else nullcontext():
+                async with self._running:
+                    self._waiting -= 1
+                    waiting = False
+                    if album_started is not None:
+                        album_started.set()
+                    await self._run(coroutine, time.monotonic() - enqueued_at)
+        finally:
+            if waiting:
+                self._waiting -= 1
+            if album_started is not None:
+                del turn.albums[album_id]
+                # Items still waiting run on their own, as the start of a new album
+                album_started.set()
+            if turn is not None:
+                self._release(key, turn)
+
+    async def _join_album(self, album_started: asyncio.Event, coroutine: Awaitable[Any]):
+        enqueued_at = time.monotonic()
+        self._waiting += 1
+        try:
+            await album_started.wait()
+        finally:
+            self._waiting -= 1
+        await self._run(coroutine, time.monotonic() - enqueued_at)
+
+    def _release(self, key: Hashable, turn: _UserTurn):
+        turn.references -= 1
+        if turn.references == 0:
+            del self._turns[key]
+
+    async def _run(self, coroutine: Awaitable[Any], wait: float):
+        metrics = self.metrics
+        self._in_flight += 1
+        metrics.max_in_flight = max(metrics.max_in_flight, self._in_flight)
+        metrics.total_wait += wait
+        metrics.max_wait = max(metrics.max_wait, wait)
+        started_at = time.monotonic()
+        try:
+            await coroutine
+            metrics.processed += 1
+        except Exception:
+            metrics.failed += 1
+            raise
+        finally:
+            self._in_flight -= 1
+            metrics.total_duration += time.monotonic() - started_at
+
+    async def initialize(self):
+        """Nothing to set up"""
+
+    async def shutdown(self):
+        """Nothing to release; the application waits for running updates itself"""
+
+    def get_metrics(self) -> dict:
+        """Snapshot of in-flight updates and processing times"""
+        metrics = self.metrics
+        finished = metrics.processed + metrics.failed
+        return {
+            'in_flight': self._in_flight,
+            'waiting': self._waiting,
+            'users': len(self._turns),
+            'processed': metrics.processed,
+            'failed': metrics.failed,
+            'max_in_flight': metrics.max_in_flight,
+            'avg_wait_ms': metrics.total_wait / finished * 1000 if finished else 0.0,
+            'max_wait_ms': metrics.max_wait * 1000,
+            'avg_duration_ms': metrics.total_duration / finished * 1000 if finished else 0.0,
+        }
+
+_processor: Optional[UserOrderedUpdateProcessor] = None
+
+def get_update_processor() -> UserOrderedUpdateProcessor:
+    """Get the shared update processor"""
+    global _processor
+    if _processor is None:
+        _processor = UserOrderedUpdateProcessor()
+    return _processor
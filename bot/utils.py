@@ -4,39 +4,23 @@ Utility functions for the bot
 
 import logging
 from datetime import datetime
-from bot.database import get_setting
+from bot.database import get_settings
+from bot.config import DEFAULT_DISPLAY_NAME_PREFIX
 
 logger = logging.getLogger(__name__)
 
 def get_rate_limit_minutes() -> int:
     """Get current rate limit in minutes"""
-    try:
-        rate_limit = get_setting('rate_limit_minutes')
-        return int(rate_limit) if rate_limit else 5
-    except Exception as e:
-        logger.error(f"Error getting rate limit: {e}")
-        return 5
+    return get_settings().rate_limit_minutes
 
 def get_activity_hours() -> tuple:
     """Get activity start and end hours"""
-    try:
-        start_hour = get_setting('activity_start_hour')
-        end_hour = get_setting('activity_end_hour')
-        start = int(start_hour) if start_hour else 0
-        end = int(end_hour) if end_hour else 23
-        return start, end
-    except Exception as e:
-        logger.error(f"Error getting activity hours: {e}")
-        return 0, 23
+    settings = get_settings()
+    return settings.activity_start_hour, settings.activity_end_hour
 
 def requires_approval() -> bool:
     """Check if media requires approval"""
-    try:
-        require_approval = get_setting('require_approval')
-        return require_approval == 'true' if require_approval else True
-    except Exception as e:
-        logger.error(f"Error checking approval requirement: {e}")
-        return True
+    return get_settings().require_approval
 
 def format_time_remaining(minutes: int) -> str:
     """Format remaining time in a user-friendly way"""
@@ -69,6 +53,10 @@ def is_valid_display_name(name: str) -> bool:
     if not re.match(r'^[\u0600-\u06FF\u200C\u200Da-zA-Z0-9\s\-_\.]+$', name.strip()):
         return False
     
+    # Default names (prefix followed by a number) are reserved for new users
+    if re.match(r'^' + re.escape(DEFAULT_DISPLAY_NAME_PREFIX) + r'\d+$', name.strip()):
+        return False
+    
     return True
 
 def sanitize_text(text: str) -> str:
@@ -89,6 +77,7 @@ def get_file_type_name(file_type: str) -> str:
         'audio': 'صوت',
         'voice': 'پیام صوتی',
         'document': 'فایل',
-        'animation': 'انیمیشن'
+        'animation': 'انیمیشن',
+        'album': 'آلبوم'
     }
     return type_names.get(file_type, 'فایل')
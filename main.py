@@ -9,11 +9,30 @@ import logging
 import asyncio
 import threading
 import time
+from functools import partial
+from urllib.parse import urlsplit
+from telegram.request import BaseRequest
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters
 
 from bot.handlers import start_handler, message_handler
 from bot.admin_handlers import admin_callback_handler
-from bot.database import init_database
+from bot.menu_handlers import get_route_metrics
+from bot.database import (
+    init_database, flush_message_logs, close_db_connections, prune_outbox, prune_decided_media,
+    prune_media_history
+)
+from bot.async_database import shutdown_db_executor
+from bot.outbound import OutboundScheduler, get_outbound_scheduler
+from bot.publisher import get_outbox_publisher
+from bot.update_processor import UserOrderedUpdateProcessor, get_update_processor
+from bot.maintenance import register_periodic_job, start_maintenance, stop_maintenance
+from bot.rate_limiter import persist_rate_limits, restore_rate_limits
+from bot.conversation_state import persist_conversation_states, restore_conversation_states
+from bot.config import (
+    RATE_LIMIT_PERSIST_SECONDS, CONVERSATION_STATE_PERSIST_SECONDS, PRUNE_INTERVAL_SECONDS, OUTBOX_RETENTION_DAYS, DECIDED_MEDIA_RETENTION_DAYS,
+    DUPLICATE_MEDIA_WINDOW_DAYS, WEBHOOK_URL, WEBHOOK_SECRET_TOKEN, WEBHOOK_LISTEN, WEBHOOK_PORT,
+    WEBHOOK_MAX_CONNECTIONS
+)
 
 # Configure logging
 logging.basicConfig(
@@ -22,29 +41,51 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def keep_alive():
-    """Keep the program alive by periodically logging status"""
+ALLOWED_UPDATES = ["message", "callback_query"]
+
+def format_metrics(metrics: dict) -> str:
+    """Render a metrics snapshot as one log-friendly line"""
+    return ", ".join(f"{name}={value:.1f}" if isinstance(value, float) else f"{name}={value}"
+                     for name, value in metrics.items())
+
+def keep_alive(scheduler: OutboundScheduler, processor: UserOrderedUpdateProcessor):
+    """Keep the program alive by periodically logging status and metrics"""
     while True:
         time.sleep(300)  # Every 5 minutes
         logger.info("Bot is running and active")
+        logger.info(f"Updates: {format_metrics(processor.get_metrics())}")
+        logger.info(f"Outbound calls: {format_metrics(scheduler.get_metrics())}")
+        routes = [f"{label} ({format_metrics(route)})" for label, route in get_route_metrics().items() if route['calls']]
+        if routes:
+            logger.info(f"Keyboard buttons: {'; '.join(routes)}")
 
-def main():
-    """Start the bot"""
-    # Get bot token from environment
-    bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
-    if not bot_token:
-        logger.error("TELEGRAM_BOT_TOKEN environment variable not set")
-        return
-    
-    # Initialize database
-    init_database()
-    
-    # Start keep-alive thread
-    keep_alive_thread = threading.Thread(target=keep_alive, daemon=True)
-    keep_alive_thread.start()
-    
-    # Create application
-    application = Application.builder().token(bot_token).build()
+async def post_init(application: Application):
+    """Start background jobs once the event loop is running"""
+    start_maintenance()
+    get_outbox_publisher().start(application.bot)
+
+async def post_shutdown(application: Application):
+    """Stop background jobs and persist their state"""
+    await get_outbox_publisher().stop()
+    await get_outbound_scheduler().close()
+    await stop_maintenance()
+
+def build_application(token: str, request: BaseRequest = None) -> Application:
+    """Create the application with every handler registered
+
+    A custom request object replaces the HTTP client for all Bot API calls,
+    which lets benchmarks run the real handlers against a fake Telegram.
+    """
+    builder = (
+        Application.builder()
+        .token(token)
+        .concurrent_updates(get_update_processor())
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+    )
+    if request is not None:
+        builder = builder.request(request).get_updates_request(request)
+    application = builder.build()
     
     # Add handlers
     # Command handlers
@@ -62,10 +103,61 @@ def main():
         (filters.PHOTO | filters.VIDEO | filters.AUDIO | filters.Document.ALL | filters.VOICE) & ~filters.COMMAND,
         message_handler
     ))
+    return application
+
+def main():
+    """Start the bot"""
+    # Get bot token from environment
+    bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
+    if not bot_token:
+        logger.error("TELEGRAM_BOT_TOKEN environment variable not set")
+        return
+    if WEBHOOK_URL and not WEBHOOK_SECRET_TOKEN:
+        logger.error("TELEGRAM_WEBHOOK_SECRET must be set to receive updates by webhook")
+        return
+    
+    # Initialize database
+    init_database()
+    restore_rate_limits()
+    restore_conversation_states()
+    register_periodic_job("persist_rate_limits", RATE_LIMIT_PERSIST_SECONDS, persist_rate_limits)
+    register_periodic_job("persist_conversation_states", CONVERSATION_STATE_PERSIST_SECONDS,
+                          persist_conversation_states)
+    register_periodic_job("prune_outbox", PRUNE_INTERVAL_SECONDS, partial(prune_outbox, OUTBOX_RETENTION_DAYS))
+    register_periodic_job("prune_decided_media", PRUNE_INTERVAL_SECONDS,
+                          partial(prune_decided_media, DECIDED_MEDIA_RETENTION_DAYS))
+    register_periodic_job("prune_media_history", PRUNE_INTERVAL_SECONDS,
+                          partial(prune_media_history, DUPLICATE_MEDIA_WINDOW_DAYS))
+    
+    # Start keep-alive thread
+    keep_alive_thread = threading.Thread(target=keep_alive, args=(get_outbound_scheduler(), get_update_processor()),
+                                         daemon=True)
+    keep_alive_thread.start()
+    
+    # Create application
+    application = build_application(bot_token)
     
     # Start the bot
     logger.info("Starting bot...")
-    application.run_polling(allowed_updates=["message", "callback_query"])
+    try:
+        if WEBHOOK_URL:
+            # Telegram posts updates to WEBHOOK_URL; the server acknowledges each
+            # one as soon as it is on the update queue
+            application.run_webhook(
+                listen=WEBHOOK_LISTEN,
+                port=WEBHOOK_PORT,
+                url_path=urlsplit(WEBHOOK_URL).path.lstrip('/'),
+                webhook_url=WEBHOOK_URL,
+                secret_token=WEBHOOK_SECRET_TOKEN,
+                allowed_updates=ALLOWED_UPDATES,
+                max_connections=WEBHOOK_MAX_CONNECTIONS
+            )
+        else:
+            application.run_polling(allowed_updates=ALLOWED_UPDATES)
+    finally:
+        shutdown_db_executor()
+        flush_message_logs()
+        close_db_connections()
 
 if __name__ == "__main__":
     main()
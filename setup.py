@@ -7,7 +7,7 @@ setup(
     author="Developer",
     packages=find_packages(),
     install_requires=[
-        "python-telegram-bot==20.7",
+        "python-telegram-bot[webhooks]==20.7",
     ],
     python_requires=">=3.11",
     classifiers=[
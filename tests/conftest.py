@@ -0,0 +1,26 @@
+"""
+Shared fixtures for the test suite
+"""
+
+import os
+import sys
+import tempfile
+
+# Never let an import of bot.database point at the real database file
+os.environ["BOT_DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bot_tests_"), "import.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+from bot import database  # noqa: E402
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A freshly initialized database in a temporary directory"""
+    database.close_db_connections()
+    monkeypatch.setattr(database, "DATABASE_PATH", str(tmp_path / "bot.db"))
+    database.init_database()
+    yield database
+    database.flush_message_logs()
+    database.close_db_connections()
+    database._invalidate_caches()
@@ -0,0 +1,25 @@
+"""
+Tests for the serialize-once keyboard markups
+"""
+
+import pytest
+from telegram import InlineKeyboardMarkup
+
+from bot.keyboards import get_channel_link_keyboard, get_main_menu
+
+def test_cached_markup_serializes_like_ptb_and_hands_out_copies():
+    markup = get_channel_link_keyboard('example')
+    expected = InlineKeyboardMarkup(markup.inline_keyboard).to_dict()
+
+    first = markup.to_dict()
+    first['inline_keyboard'][0][0]['text'] = 'changed'
+    first['inline_keyboard'].clear()
+
+    assert markup.to_dict() == expected
+    assert get_channel_link_keyboard('example') is markup
+
+def test_static_menu_stays_frozen():
+    menu = get_main_menu()
+    menu.to_dict()
+    with pytest.raises(AttributeError):
+        menu.resize_keyboard = False
@@ -0,0 +1,85 @@
+"""
+Tests for recording moderation decisions on pending media
+"""
+
+import threading
+
+def build_channel_text(media: dict) -> str:
+    return f"{media['caption']}\n\n👤 {media['display_name']}"
+
+def decide_concurrently(db, media_id: int, decisions: list) -> list:
+    """Record each (admin_id, decision) from its own thread at the same moment"""
+    barrier = threading.Barrier(len(decisions))
+    results = [None] * len(decisions)
+
+    def decide(index: int, admin_id: int, decision: str):
+        barrier.wait()
+        results[index] = db.decide_pending_media(media_id, admin_id, decision, build_channel_text)
+
+    threads = [threading.Thread(target=decide, args=(index, admin_id, decision))
+               for index, (admin_id, decision) in enumerate(decisions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def outbox_rows(db) -> list:
+    return db.get_db_connection().execute('SELECT * FROM outbox').fetchall()
+
+def test_concurrent_approvals_publish_once(db):
+    db.get_or_create_user(7)
+    media_id = db.add_pending_media(7, 1, 'F1', 'photo', 'caption', file_unique_id='U1')
+
+    results = decide_concurrently(db, media_id, [(101, 'approved'), (102, 'approved')])
+
+    claimed = [media for won, media in results if won]
+    assert len(claimed) == 1
+    assert len(outbox_rows(db)) == 1
+    lost = [media for won, media in results if not won]
+    assert lost[0]['state'] == 'approved'
+    assert lost[0]['decided_by'] == claimed[0]['decided_by']
+
+def test_concurrent_approval_and_rejection_record_one_decision(db):
+    db.get_or_create_user(7)
+    media_id = db.add_pending_media(7, 1, 'F1', 'photo', 'caption', file_unique_id='U1')
+
+    results = decide_concurrently(db, media_id, [(101, 'approved'), (102, 'rejected')])
+
+    assert sum(1 for won, _ in results if won) == 1
+    state = db.get_pending_media(media_id)['state']
+    assert len(outbox_rows(db)) == (1 if state == 'approved' else 0)
+    assert db.find_media_decision('U1', 30) == state
+
+def test_decision_takes_approval_prompts(db):
+    db.get_or_create_user(7)
+    media_id = db.add_pending_media(7, 1, 'F1', 'photo', 'caption')
+    assert db.record_approval_prompts(media_id, [(101, 11), (102, 12)])
+
+    claimed, media = db.decide_pending_media(media_id, 101, 'rejected')
+
+    assert claimed
+    assert sorted(media['prompts']) == [(101, 11), (102, 12)]
+    assert not db.record_approval_prompts(media_id, [(103, 13)])
+
+def test_approval_carries_over_only_to_the_same_caption(db):
+    db.get_or_create_user(7)
+    media_id = db.add_pending_media(7, 1, 'F1', 'photo', 'original', file_unique_id='U1')
+    db.decide_pending_media(media_id, 101, 'approved', build_channel_text)
+
+    assert db.find_media_decision('U1', 30, 'original') == 'approved'
+    assert db.find_media_decision('U1', 30, '') == 'approved'
+    assert db.find_media_decision('U1', 30, 'something else') is None
+
+def test_failed_prompt_insert_reports_not_recorded(db):
+    db.get_or_create_user(7)
+    media_id = db.add_pending_media(7, 1, 'F1', 'photo', 'caption')
+    conn = db.get_db_connection()
+    conn.execute('''
+        CREATE TEMP TRIGGER fail_prompt_insert BEFORE INSERT ON approval_prompts
+        BEGIN SELECT RAISE(ABORT, 'disk full'); END
+    ''')
+
+    assert not db.record_approval_prompts(media_id, [(101, 11)])
+    assert conn.execute('SELECT COUNT(*) FROM approval_prompts').fetchone()[0] == 0
+    assert db.get_pending_media(media_id)['state'] == 'pending'
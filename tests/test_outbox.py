@@ -0,0 +1,16 @@
+"""
+Tests for outbox leases shared between bot instances
+"""
+
+def test_release_leaves_other_instances_leases_alone(db):
+    first = db.enqueue_channel_post(7, 'text', 'first')
+    second = db.enqueue_channel_post(7, 'text', 'second')
+
+    assert [entry['id'] for entry in db.claim_due_outbox(1, 300, 'a')] == [first]
+    # Another instance only sees the entry that is not leased
+    assert [entry['id'] for entry in db.claim_due_outbox(10, 300, 'b')] == [second]
+
+    # Instance a restarting replays its own lease, never b's
+    assert db.release_outbox_leases('a') == 1
+    assert [entry['id'] for entry in db.claim_due_outbox(10, 300, 'a')] == [first]
+    assert db.claim_due_outbox(10, 300, 'c') == []
@@ -0,0 +1,102 @@
+"""
+Tests for the per-user ordered update processor
+"""
+
+import asyncio
+import random
+from datetime import datetime
+
+from telegram import Chat, Message, Update, User
+
+from bot.update_processor import UserOrderedUpdateProcessor
+
+def make_update(update_id: int, user_id: int, media_group_id: str = None) -> Update:
+    return Update(update_id, message=Message(update_id, datetime.now(), Chat(user_id, Chat.PRIVATE),
+                                             from_user=User(user_id, 'u', False), media_group_id=media_group_id))
+
+async def process_interleaved(processor: UserOrderedUpdateProcessor, users: int, per_user: int) -> list:
+    """Submit each user's updates round-robin and return (user, sequence) in completion order"""
+    rng = random.Random(1)
+    finished = []
+
+    async def handle(user_id: int, sequence: int, delay: float):
+        await asyncio.sleep(delay)
+        finished.append((user_id, sequence))
+
+    tasks = []
+    update_ids = iter(range(1, users * per_user + 1))
+    for sequence in range(per_user):
+        for user_id in range(1, users + 1):
+            # Earlier updates get longer delays, so they would finish last if not ordered
+            delay = rng.uniform(0, 0.01) * (per_user - sequence)
+            update = make_update(next(update_ids), user_id)
+            tasks.append(asyncio.create_task(processor.process_update(update, handle(user_id, sequence, delay))))
+    await asyncio.gather(*tasks)
+    return finished
+
+def test_each_users_updates_finish_in_order():
+    processor = UserOrderedUpdateProcessor(max_concurrent_updates=8)
+    finished = asyncio.run(process_interleaved(processor, users=5, per_user=6))
+
+    assert len(finished) == 30
+    for user_id in range(1, 6):
+        assert [sequence for user, sequence in finished if user == user_id] == list(range(6))
+    # Different users were processed concurrently, and nothing is left behind
+    assert processor.metrics.max_in_flight > 1
+    assert processor.get_metrics()['users'] == 0
+
+def test_concurrency_cap_is_respected():
+    processor = UserOrderedUpdateProcessor(max_concurrent_updates=2)
+    asyncio.run(process_interleaved(processor, users=6, per_user=3))
+
+    assert processor.metrics.max_in_flight == 2
+    assert processor.metrics.processed == 18
+
+def test_failed_update_does_not_block_the_user():
+    processor = UserOrderedUpdateProcessor()
+    finished = []
+
+    async def fail():
+        raise RuntimeError("handler failed")
+
+    async def succeed():
+        finished.append(True)
+
+    async def run():
+        results = await asyncio.gather(processor.process_update(make_update(1, 1), fail()),
+                                       processor.process_update(make_update(2, 1), succeed()),
+                                       return_exceptions=True)
+        return results
+
+    results = asyncio.run(run())
+
+    assert isinstance(results[0], RuntimeError)
+    assert finished == [True]
+    assert processor.metrics.failed == 1
+
+def test_album_items_join_the_first_item_and_later_updates_wait_for_it():
+    processor = UserOrderedUpdateProcessor(max_concurrent_updates=1)
+    events = []
+
+    async def first_item():
+        events.append('album opened')
+        # Stands in for waiting until the album is quiet
+        await asyncio.sleep(0.05)
+        events.append('album handled')
+
+    async def record(name: str):
+        events.append(name)
+
+    async def run():
+        updates = [
+            processor.process_update(make_update(1, 1, 'G'), first_item()),
+            processor.process_update(make_update(2, 1, 'G'), record('item 2')),
+            processor.process_update(make_update(3, 1), record('text')),
+            processor.process_update(make_update(4, 1, 'G'), record('item 3')),
+        ]
+        await asyncio.gather(*updates)
+
+    asyncio.run(run())
+
+    assert events == ['album opened', 'item 2', 'item 3', 'album handled', 'text']
+    assert processor.get_metrics()['users'] == 0